@@ -1,23 +1,47 @@
-from Tools.scripts.treesync import raw_input
+import argparse
+import json
+import sys
+from time import gmtime, perf_counter, strftime
+
+import numpy as np
 
 from SmartPlayer import smartPlayer
 from RandomPlayer import RandomPlayer
 from AlwaysReciprocatePlayer import AlwaysReciprocatePlayer
 from NonReciprocativePlayer import NonReciprocativePlayer
-from graph import Graph
+from eventLog import openEventSink, levelNames, LOG_SUMMARY, LOG_ROUNDS, \
+    LOG_MATCHES, LOG_FULL
+from matchEngine import MatchEngine, typeNames, SMART
+from population import Population
+from player import PlayerRegistry
+from profiling import Profiler
+from roundStats import RoundStatsCollector
+from seeding import RunSeeds
+import checkpoint
 import clusterRandNetwork
-from time import gmtime, strftime
+import networks
+from csrGraph import CSRGraph
+from networkCache import NetworkCache
+from convergence import ConvergenceDetector
+from scheduler import SCHEDULES, createScheduler
+from strategies import STRATEGIES
+import simConfig
+
 global_beta = 0
+# a network shuffle gives up after this many rewiring steps per edge, or
+# after this many steps in a row that did not get closer to the target
+SHUFFLE_STEPS_PER_EDGE = 100
+SHUFFLE_STALL_STEPS = 5000
 
 
-def smartCreator(n, numOfTrusters, Coefficient):
+def smartCreator(n, numOfTrusters, Coefficient, store=None):
     smarts = []
     for i in range(n):
         if numOfTrusters > 0:
-            smart = smartPlayer(True, Coefficient, global_beta)
+            smart = smartPlayer(True, Coefficient, global_beta, store)
             numOfTrusters -= 1
         else:
-            smart = smartPlayer(False, Coefficient, global_beta)
+            smart = smartPlayer(False, Coefficient, global_beta, store)
         smarts.append(smart)
     return smarts
 
@@ -33,7 +57,7 @@ def randCreator(n, Coefficient):
 def alwaysRec(n):
     recs = []
     for i in range(n):
-        rec = AlwaysReciprocatePlayer()
+        rec = AlwaysReciprocatePlayer(False, None, global_beta)
         recs.append(rec)
     return recs
 
@@ -41,7 +65,7 @@ def alwaysRec(n):
 def nonRec(n):
     nonRecs = []
     for i in range(n):
-        nonr = NonReciprocativePlayer()
+        nonr = NonReciprocativePlayer(False, None)
         nonRecs.append(nonr)
     return nonRecs
 
@@ -103,100 +127,563 @@ def printLogFile(smarts, rands, recs, nonRecs):
     f.write(
         "################\n" + "Number of randoms :" + str(len(rands)) + "\n")
     for rand in rands:
-        f.write(rand)
+        f.write(str(rand))
     f.write("################\n")
     f.write("# Always reciprocatives:#\n")
     f.write("################\n" + "Number of reciprocative bots:" + str(
         len(recs)) + "\n")
     for rec in recs:
-        f.write(rec)
+        f.write(str(rec))
     f.write("################\n")
     f.write("# Non-reciprocatives:#\n")
     f.write("################\n" + "Number of reciprocative bots:" + str(
         len(recs)) + "\n")
     for rec in nonRecs:
-        f.write(rec)
+        f.write(str(rec))
     f.close()
 
 
-if __name__ == '__main__':
+def summarize(engine):
+    """ returns the mean currency of every player type in the engine """
+    summary = {}
+    for code, name in enumerate(typeNames):
+        mask = engine.typeCode == code
+        summary[name + "s"] = int(mask.sum())
+        if mask.any():
+            summary[name + "Currency"] = float(engine.currency[mask].mean())
+        else:
+            summary[name + "Currency"] = float("nan")
+    return summary
+
+
+def shuffleNetwork(n, edges, clusterCoefficient, seed=None, progress=None,
+                   chains=1):
+    """ shuffles the edges towards the clustering coefficient and returns
+        the new (E, 2) edge array, u < v. With more than one chain
+        clusterRandNetwork.parallel_bansal_shuffle is used. An unreachable
+        target gives the closest network found within the shuffle budget
+        (SHUFFLE_STEPS_PER_EDGE, SHUFFLE_STALL_STEPS) and a RuntimeWarning
+    """
+    g = CSRGraph.fromEdges(n, edges).toShuffleGraph()
+    maxiter = SHUFFLE_STEPS_PER_EDGE * len(edges)
+    if chains > 1:
+        g, niter, gcc, traces = clusterRandNetwork.parallel_bansal_shuffle(
+            g, clusterCoefficient, chains, maxiter=maxiter, seed=seed,
+            max_stall=SHUFFLE_STALL_STEPS)
+        if progress is not None:
+            for chain, trace in enumerate(traces):
+                progress.chain(chain, *trace[-1])
+    else:
+        clusterRandNetwork.bansal_shuffle(g, clusterCoefficient,
+                                          maxiter=maxiter, seed=seed,
+                                          incremental=True, callback=progress,
+                                          max_stall=SHUFFLE_STALL_STEPS)
+    return g.toCSR().edgeArray()
+
+
+def networkEdges(networkType, trusters, trustees, clusterCoefficient=0,
+                 seed=None, topology="bipartite", meanDegree=10, progress=None,
+                 shuffleChains=1):
+    """ returns the indices of both sides of every match played in a round,
+        for "trusters" trusters followed by "trustees" trustees. Network type
+        3 is a sparse random topology (see networks) with about meanDegree
+        matches per player, shuffled towards clusterCoefficient if that is
+        not 0. seed is a SeedSequence or int for the network generator and
+        shuffle, progress and shuffleChains are passed to shuffleNetwork
+    """
+    n = trusters + trustees
+    if networkType == 1:
+        index = np.arange(n)
+        p1 = np.repeat(index[:trusters], trustees)
+        p2 = np.tile(index[trusters:], trusters)
+        return p1, p2
+
+    if networkType == 2:
+        # the complete truster/trustee graph, shuffled once towards the
+        # target clustering coefficient
+        p1, p2 = networkEdges(1, trusters, trustees)
+        edges = shuffleNetwork(n, np.column_stack((p1, p2)),
+                               clusterCoefficient, seed, progress,
+                               shuffleChains)
+        return edges[:, 0], edges[:, 1]
+
+    if networkType == 3:
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        generateSeed, shuffleSeed = seed.spawn(2)
+        edges = networks.generate(topology, trusters, trustees, meanDegree,
+                                  generateSeed)
+        if clusterCoefficient:
+            edges = shuffleNetwork(n, edges, clusterCoefficient, shuffleSeed,
+                                   progress, shuffleChains)
+        return edges[:, 0], edges[:, 1]
+
+    raise ValueError("unknown network type: {0}".format(networkType))
+
+
+class ShuffleProgress(object):
+    """ bansal_shuffle callback printing the GCC every "every" steps """
+
+    def __init__(self, target, every=10000, stream=None):
+        self.target = target
+        self.every = every
+        self.stream = stream if stream is not None else sys.stderr
+        self.start = perf_counter()
+
+    def __call__(self, niter, gcc):
+        if niter % self.every == 0:
+            self.stream.write(
+                "shuffle: {0} steps, GCC {1:.4f} (target {2}), {3:.1f}s\n"
+                .format(niter, gcc, self.target, perf_counter() - self.start))
+            self.stream.flush()
+
+    def chain(self, chain, niter, gcc):
+        """ reports the end of one chain of a parallel shuffle """
+        self.stream.write("shuffle chain {0}: {1} steps, GCC {2:.4f}\n".format(
+            chain, int(niter), gcc))
+
+
+def runSimulation(smarts, trusters, coeff, beta, rounds, networkType=1,
+                  clusterCoefficient=0, randoms=0, recs=0, nonRecs=0,
+                  warmupRounds=30, seed=None, logPath=None, eventLog=None,
+                  logLevel=LOG_SUMMARY, profiler=None, checkpointDir=None,
+                  checkpointEvery=0, resume=False, statsPath=None,
+                  topology="bipartite", meanDegree=10, progress=False,
+                  shuffleChains=1, networkCache=None, schedule="sync",
+                  eventRate=1., participation=1., convergence="off",
+                  convergenceTolerance=1e-9, convergencePatience=10,
+                  strategies=None, closedForm=False):
+    """ runs a single game and returns the summary of its final state.
+        Nothing is written to disk unless a log path or an event sink
+        (see eventLog) is given, and only as much as logLevel asks for.
+        Phase timings and counters go to "profiler" if one is given.
+
+        With a checkpoint directory the full game state is saved every
+        checkpointEvery rounds; with resume=True the game continues from the
+        latest checkpoint there and ends exactly as an uninterrupted run.
+        With a stats path, per-round aggregates are streamed there (see
+        roundStats).
+
+        All randomness comes from independent streams of one seed hierarchy
+        (see seeding): random decisions of a round are one vectorized draw
+        from the "engine" stream and the network is shuffled on the "network"
+        stream. With progress=True the network shuffle reports its progress
+        on stderr; with shuffleChains > 1 it runs that many chains in
+        parallel and keeps the best. Clustered and sparse networks of seeded
+        runs are looked up in and added to networkCache, a NetworkCache or
+        its directory.
+
+        schedule picks when matches are played (see scheduler): "sync"
+        plays every edge once per round, "poisson" gives every edge a
+        Poisson clock of eventRate events per round. With participation < 1
+        each player only takes part in a round with that probability.
+
+        With convergence="stop" the game ends as soon as it is stationary:
+        no decision changed and no estimation moved by more than
+        convergenceTolerance for convergencePatience rounds. With
+        convergence="forward" rounds whose decisions are known in advance
+        are played analytically instead (see convergence); they are not
+        logged. Both need the sync schedule with full participation.
+
+        With closedForm=True matches whose outcome can no longer change are
+        played in closed form (see MatchEngine.runRounds), which differs
+        from playing them by floating point rounding. It needs the sync
+        schedule with full participation, and neither convergence
+        detection nor round logs or statistics.
+
+        strategies maps player type names to the names of the strategies
+        they play instead of their own (see strategies), e.g.
+        {"smart": "titForTat"}
+    """
     global global_beta
-    smarts = []
-    randoms = []
-    recs = []
-    nonRecs = []
-    clusterCoefficient = 0
-    smartsNumber = int(input("Please insert number of Smart players: "))
-    trusters = int(input("Please insert amount of trusters among them: "))
-    coeff = float(
+    params = {"smarts": smarts, "trusters": trusters, "coeff": coeff,
+              "beta": beta, "rounds": rounds, "networkType": networkType,
+              "clusterCoefficient": clusterCoefficient, "randoms": randoms,
+              "recs": recs, "nonRecs": nonRecs, "warmupRounds": warmupRounds,
+              "seed": seed, "topology": topology, "meanDegree": meanDegree,
+              "shuffleChains": shuffleChains, "schedule": schedule,
+              "eventRate": eventRate, "participation": participation,
+              "convergence": convergence,
+              "convergenceTolerance": convergenceTolerance,
+              "convergencePatience": convergencePatience,
+              "strategies": strategies, "closedForm": closedForm}
+    global_beta = beta
+    if convergence != "off" and (schedule != "sync" or participation < 1):
+        raise ValueError("convergence detection needs the sync schedule "
+                         "with full participation")
+    if closedForm and (schedule != "sync" or participation < 1 or
+                       convergence != "off" or statsPath is not None or
+                       (logPath is not None and logLevel >= LOG_ROUNDS) or
+                       (eventLog is not None and logLevel >= LOG_MATCHES)):
+        raise ValueError("closed form play needs the sync schedule with "
+                         "full participation and no convergence detection, "
+                         "round logs or statistics")
+    if profiler is None:
+        profiler = Profiler()
+    saved = None
+    if resume and checkpointDir is not None:
+        saved = checkpoint.load(checkpointDir)
+    if saved is not None:
+        saved.checkParameters(params)
+    seeds = RunSeeds(seed)
+    with profiler.phase("players"):
+        # the players, already in the engine order trusters + trustees. Ids
+        # come from a registry of the run, so every run numbers its players
+        # from 0 whatever ran before it in this process
+        population = Population.fromCounts(smarts, trusters, coeff, randoms,
+                                           recs, nonRecs, PlayerRegistry())
+        # as the constructors of these player types would
+        if smarts:
+            smartPlayer.bank.global_bank_fee = beta
+        if recs:
+            AlwaysReciprocatePlayer.bank.global_bank_fee = beta
+        trusters = int(population.trustor.sum())
+        trustees = len(population) - trusters
+    f = None
+    if logPath is not None and logLevel >= LOG_SUMMARY:
+        if saved is not None:
+            # drop whatever was logged after the checkpoint
+            f = open(logPath, "r+")
+            f.truncate(saved.state["logOffset"])
+            f.seek(saved.state["logOffset"])
+        else:
+            f = open(logPath, "w")
+    logRounds = f is not None and logLevel >= LOG_ROUNDS
+    logMatches = eventLog is not None and logLevel >= LOG_MATCHES
+    logTrust = f is not None and logLevel >= LOG_FULL
+    if logMatches and saved is None:
+        with profiler.phase("logging"):
+            printLogFile(*[population.ofType(code)
+                           for code in range(len(typeNames))])
+    with profiler.phase("network"):
+        if saved is not None:
+            p1 = np.array(saved.arrays["p1"])
+            p2 = np.array(saved.arrays["p2"])
+        else:
+            cache = None
+            if networkCache is not None and networkType != 1 and \
+                    seed is not None:
+                cache = networkCache
+                if not isinstance(cache, NetworkCache):
+                    cache = NetworkCache(cache)
+            networkParams = {"networkType": networkType,
+                             "trusters": trusters, "trustees": trustees,
+                             "clusterCoefficient": clusterCoefficient,
+                             "shuffleChains": shuffleChains, "seed": seed}
+            if networkType == 3:
+                networkParams["topology"] = topology
+                networkParams["meanDegree"] = meanDegree
+            edges = cache.get(networkParams) if cache is not None else None
+            if edges is not None:
+                profiler.count("networkCacheHits", 1)
+                p1 = edges[:, 0].astype(np.intp)
+                p2 = edges[:, 1].astype(np.intp)
+            else:
+                p1, p2 = networkEdges(
+                    networkType, trusters, trustees, clusterCoefficient,
+                    seeds.stream("network"), topology, meanDegree,
+                    ShuffleProgress(clusterCoefficient) if progress else None,
+                    shuffleChains)
+                if cache is not None:
+                    cache.put(networkParams, np.column_stack((p1, p2)))
+        engine = MatchEngine(population, warmupRounds,
+                             rng=seeds.generator("engine"), pairs=(p1, p2),
+                             strategies=strategies)
+        scheduler = createScheduler(schedule, p1, p2, len(population),
+                                    eventRate, participation,
+                                    seeds.generator("schedule"))
+        detector = None
+        if convergence != "off":
+            detector = ConvergenceDetector(engine, p1, p2,
+                                           convergenceTolerance,
+                                           convergencePatience)
+
+    first = 0
+    if saved is not None:
+        saved.restore(engine, scheduler, detector)
+        first = saved.round
+        if eventLog is not None:
+            eventLog.resumeFrom(saved.state["eventChunks"])
+    if logMatches:
+        eventLog.writePlayers(population.ids, engine.typeCode)
+    stats = None
+    if statsPath is not None:
+        stats = RoundStatsCollector(
+            statsPath, engine,
+            resumeState=saved.state["stats"] if saved is not None else None)
+    logging = logRounds or logMatches or logTrust
+    checkpointing = checkpointDir is not None and checkpointEvery > 0
+    matchTime = logTime = 0.
+    matches = playedRounds = forwarded = closedFormMatches = 0
+
+    def saveCheckpoint(done):
+        with profiler.phase("checkpoint"):
+            eventChunks = logOffset = 0
+            if eventLog is not None:
+                eventLog.flush()
+                eventChunks = eventLog.chunks
+            if f is not None:
+                f.flush()
+                logOffset = f.tell()
+            checkpoint.save(checkpointDir, done, engine, p1, p2, params,
+                            eventChunks, logOffset,
+                            stats.state() if stats is not None else None,
+                            scheduler=scheduler, convergence=detector)
+
+    # nothing needs the outcome of single rounds: the rounds up to the next
+    # checkpoint are left to the engine, which plays the matches whose
+    # outcome is fixed in closed form
+    i = first
+    while closedForm and i < rounds:
+        done = rounds
+        if checkpointing:
+            done = min(rounds, (i // checkpointEvery + 1) * checkpointEvery)
+        start = perf_counter()
+        played = engine.runRounds(done - i, p1, p2, closedForm=True)
+        matchTime += perf_counter() - start
+        matches += (done - i) * len(p1)
+        closedFormMatches += (done - i) * len(p1) - played
+        playedRounds += done - i
+        if checkpointing and done < rounds:
+            saveCheckpoint(done)
+        i = done
+    while i < rounds:
+        start = perf_counter()
+        batches = scheduler.round()
+        results = [engine.playRound(b1, b2) for b1, b2 in batches]
+        if len(batches) == 1:
+            r1, r2 = batches[0]
+            p1a, p2a, p1d, p2d = results[0]
+        else:
+            r1, r2 = [np.concatenate(arrays) for arrays in zip(*batches)]
+            p1a, p2a, p1d, p2d = [np.concatenate(arrays)
+                                  for arrays in zip(*results)]
+        matches += len(r1)
+        playedRounds += 1
+        played = perf_counter()
+        matchTime += played - start
+        if stats is not None:
+            with profiler.phase("stats"):
+                stats.update(i, r1, r2, p1a, p2a)
+        if logging:
+            if logRounds:
+                f.write("Round {0}: matches: {1}, trusted: {2}, reciprocated:"
+                        " {3}, currency change: {4}\n".format(
+                            i, len(p1a), int(p1a.sum()),
+                            int((p1a & p2a).sum()),
+                            float(p1d.sum() + p2d.sum())))
+            if logMatches:
+                eventLog.record(i, r1, r2, p1a, p2a, p1d, p2d)
+            if logTrust:
+                for player in population.ofType(SMART):
+                    f.write("estimations of Smart Player ID: {0}\n".format(
+                        player.id) + player.memoryPrint())
+            logTime += perf_counter() - played
+        done = i + 1
+        if detector is not None:
+            with profiler.phase("convergence"):
+                detector.update(p1a, p2a, p1d, p2d)
+                if convergence == "stop" and detector.stationary:
+                    if f is not None:
+                        f.write("Converged after round {0}\n".format(i))
+                    profiler.count("stoppedRounds", rounds - done)
+                    break
+                if convergence == "forward" and detector.settled:
+                    skip = min(detector.horizon(), rounds - done)
+                    if skip > 0:
+                        detector.forward(skip)
+                        if logRounds:
+                            f.write("Rounds {0} to {1}: fast-forwarded\n"
+                                    .format(done, done + skip - 1))
+                        forwarded += skip
+                        done += skip
+        if checkpointing and done // checkpointEvery > i // checkpointEvery \
+                and done < rounds:
+            saveCheckpoint(done)
+        i = done
+    profiler.add("matches", matchTime)
+    profiler.count("rounds", playedRounds)
+    profiler.count("forwardedRounds", forwarded)
+    profiler.count("matches", matches)
+    profiler.count("closedFormMatches", closedFormMatches)
+    if stats is not None:
+        stats.close()
+    with profiler.phase("logging"):
+        if eventLog is not None:
+            eventLog.close()
+        if f is not None:
+            f.write("END OF GAME, RESULTS: ")
+            for player in population:
+                f.write(str(player))
+            f.close()
+    profiler.add("logging", logTime)
+    return summarize(engine)
+
+
+def interactiveParameters():
+    """ asks for the simulation parameters on stdin """
+    params = {"randoms": 0, "recs": 0, "nonRecs": 0, "clusterCoefficient": 0}
+    params["smarts"] = int(input("Please insert number of Smart players: "))
+    params["trusters"] = int(
+        input("Please insert amount of trusters among them: "))
+    params["coeff"] = float(
         input("Please insert the proportion of genuinely honest trustees: "))
     bots = input("Should there be bots? Y/N: ")
     if bots == "Y" or bots == "y":
-        bots = True
-        rands = int(input("How many randoms? "))
-        recsnum = int(input("How many always reciprocative players? "))
-        nrecs = int(input("How many always non-reciprocative players? "))
-        randoms = randCreator(rands, coeff)
-        recs = alwaysRec(recsnum)
-        nonRecs = nonRec(nrecs)
-    else:
-        bots = False
-    global_beta = float(input("Please insert beta "))
-    networkType = int(input(
+        params["randoms"] = int(input("How many randoms? "))
+        params["recs"] = int(input("How many always reciprocative players? "))
+        params["nonRecs"] = int(
+            input("How many always non-reciprocative players? "))
+    params["beta"] = float(input("Please insert beta "))
+    params["networkType"] = int(input(
         "insert 1 for simple network, 2 for network with cluster coefficient "))
-    if networkType == 2:
-        clusterCoefficient = int(input(
+    if params["networkType"] == 2:
+        params["clusterCoefficient"] = float(input(
             "please insert the clustering coefficient "))
-    rounds = int(input("Please insert number of rounds: "))
-    smarts = smartCreator(smartsNumber, trusters, coeff)
-    trusters = []
-    trustees = []
-    trusters, trustees = regNetwork(smarts, rands=[], recs=[], nrecs=[])
-    warmupRounds = 30
-    printLogFile(smarts, randoms, recs, nonRecs)
+    params["rounds"] = int(input("Please insert number of rounds: "))
     timeStamp = strftime("%Y%m%d%H%M", gmtime())
-    f = open("log" + timeStamp + ".txt", "w")
-    if networkType == 1:
-        for i in range(rounds):
-            for truster in trusters:
-                for trustee in trustees:
-                    currp1 = truster.currency
-                    currp2 = trustee.currency
-                    p1a, p2a = runMatch(truster, trustee, warmupRounds > 0)
-                    f.write("Round between: \n")
-                    f.write(str(truster))
-                    f.write("Decision: {0}".format(p1a) + ", Outcome: {0}".format(
-                        truster.currency - currp1))
-                    f.write(str(trustee))
-                    f.write("Decision: {0}".format(p2a) + ", Outcome: {0}".format(
-                        trustee.currency - currp2))
-                    warmupRounds -= 1
-                    if isinstance(smartPlayer, type(truster)):
-                        f.write("estimations of Truster as a Smart Player: \n")
-                        f.write("ID: " + truster.id + "\n" + truster.memoryPrint)
-                    if isinstance(smartPlayer, type(trustee)):
-                        f.write("estimations of Trustee as a Smart Player: \n")
-                        f.write("ID: " + trustee.id + "\n" + trustee.memoryPrint)
-        f.write("END OF GAME, RESULTS: ")
-        for truster in trusters:
-            f.write(str(truster))
-        for trustee in trustees:
-            f.write(str(trustee))
+    params["logPath"] = "log" + timeStamp + ".txt"
+    params["eventLog"] = "events" + timeStamp
+    params["logLevel"] = "matches"
+    return params
 
-    if networkType == 2:
-        g = Graph()
-        for truster in trusters:
-            g.add_vertex(truster)
-            for trustee in trustees:
-                g.add_vertex((trustee))
-                g.add_edge((truster, trustee))
-                g, niter, gcc_best = clusterRandNetwork.bansal_shuffle(g,
-                                                                       clusterCoefficient)
-        for i in range(rounds):
-            for (p1, p2) in g.edges():
-                runMatch(p1, p2, warmupRounds > 0)
-                warmupRounds -= 1
-        f.write("END OF GAME, RESULTS: ")
-        for vet in g.vertices():
-            f.write(str(vet))
-    f.close()
+
+def strategyOption(value):
+    """ parses a --strategy option, TYPE=NAME, into (TYPE, NAME) """
+    typeName, sep, name = value.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(
+            "expected TYPE=NAME, got {0!r}".format(value))
+    try:
+        simConfig.checkStrategy(typeName, name)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return typeName, name
+
+
+def parseArgs(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate the trust game. Without arguments the "
+                    "parameters are asked for interactively.")
+    parser.add_argument("-c", "--config",
+                        help="JSON, YAML or TOML file with the parameters; "
+                             "command line options override it")
+    parser.add_argument("-i", "--interactive", action="store_true",
+                        help="ask for the parameters on stdin")
+    parser.add_argument("--smarts", type=int, help="number of smart players")
+    parser.add_argument("--trusters", type=int,
+                        help="amount of trusters among the smart players")
+    parser.add_argument("--coeff", type=float,
+                        help="proportion of genuinely honest trustees")
+    parser.add_argument("--beta", type=float, help="bank fee")
+    parser.add_argument("--rounds", type=int, help="number of rounds")
+    parser.add_argument("--network-type", dest="networkType", type=int,
+                        choices=(1, 2, 3),
+                        help="1 for simple network, 2 for network with "
+                             "cluster coefficient, 3 for sparse random "
+                             "network")
+    parser.add_argument("--progress", action="store_true", default=None,
+                        help="report the progress of the network shuffle")
+    parser.add_argument("--shuffle-chains", dest="shuffleChains", type=int,
+                        help="parallel chains for the network shuffle")
+    parser.add_argument("--network-cache", dest="networkCache",
+                        help="directory caching generated networks")
+    parser.add_argument("--schedule", choices=SCHEDULES,
+                        help="sync: every match once per round, poisson: "
+                             "matches on independent Poisson clocks")
+    parser.add_argument("--event-rate", dest="eventRate", type=float,
+                        help="matches per edge and round of the poisson "
+                             "schedule")
+    parser.add_argument("--participation", type=float,
+                        help="probability of a player taking part in a round")
+    parser.add_argument("--convergence", choices=("off", "stop", "forward"),
+                        help="stop a stationary game, or fast-forward its "
+                             "predictable rounds")
+    parser.add_argument("--convergence-tolerance",
+                        dest="convergenceTolerance", type=float,
+                        help="largest trust change of a stationary round")
+    parser.add_argument("--convergence-patience",
+                        dest="convergencePatience", type=int,
+                        help="unchanged rounds before the game counts as "
+                             "converged")
+    parser.add_argument("--strategy", dest="strategies", action="append",
+                        type=strategyOption, metavar="TYPE=NAME",
+                        help="let a player type play another strategy, "
+                             "one of " + ", ".join(sorted(STRATEGIES)))
+    parser.add_argument("--closed-form", dest="closedForm",
+                        action="store_true", default=None,
+                        help="play matches whose outcome can no longer "
+                             "change in closed form")
+    parser.add_argument("--topology", choices=networks.TOPOLOGIES,
+                        help="topology of network type 3")
+    parser.add_argument("--mean-degree", dest="meanDegree", type=float,
+                        help="matches per player in network type 3")
+    parser.add_argument("--cluster-coefficient", dest="clusterCoefficient",
+                        type=float, help="target clustering coefficient")
+    parser.add_argument("--randoms", type=int, help="number of random bots")
+    parser.add_argument("--recs", type=int,
+                        help="number of always reciprocative bots")
+    parser.add_argument("--non-recs", dest="nonRecs", type=int,
+                        help="number of always non-reciprocative bots")
+    parser.add_argument("--warmup-rounds", dest="warmupRounds", type=int,
+                        help="matches played before trust is updated")
+    parser.add_argument("--seed", type=int, help="random seed")
+    parser.add_argument("--log", dest="logPath", help="text log file")
+    parser.add_argument("--events", dest="eventLog",
+                        help="event log directory (or .parquet file)")
+    parser.add_argument("--log-level", dest="logLevel",
+                        choices=sorted(levelNames, key=levelNames.get))
+    parser.add_argument("--stats", dest="statsPath",
+                        help="stream per-round statistics to this file")
+    parser.add_argument("--checkpoint-dir", dest="checkpointDir",
+                        help="directory for periodic checkpoints")
+    parser.add_argument("--checkpoint-every", dest="checkpointEvery",
+                        type=int, help="rounds between checkpoints")
+    parser.add_argument("--resume", action="store_true", default=None,
+                        help="continue from the latest checkpoint")
+    parser.add_argument("--report",
+                        help="write a JSON timing and memory report here")
+    parser.add_argument("--profile",
+                        help="run under cProfile and write the stats here")
+    parser.add_argument("--trace-memory", dest="traceMemory",
+                        action="store_true",
+                        help="track peak memory with tracemalloc")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    args = parseArgs(argv)
+    if not argv or args.interactive:
+        params = simConfig.resolve(interactiveParameters())
+    else:
+        config = {}
+        if args.config is not None:
+            config = simConfig.loadConfig(args.config)
+        options = dict((key, value) for key, value in vars(args).items()
+                       if key in simConfig.PARAMETERS)
+        if args.strategies is not None:
+            options["strategies"] = dict(args.strategies)
+        try:
+            params = simConfig.resolve(config, options)
+        except ValueError as e:
+            sys.exit("error: " + str(e))
+    params["logLevel"] = levelNames[params["logLevel"]]
+    if params["eventLog"] is not None:
+        # a checkpointed run may be resumed, which Parquet logs cannot be
+        params["eventLog"] = openEventSink(
+            params["eventLog"],
+            resumable=params["checkpointDir"] is not None)
+    profiler = Profiler(args.profile is not None, args.traceMemory)
+    with profiler:
+        summary = runSimulation(profiler=profiler, **params)
+    if args.profile is not None:
+        profiler.dumpProfile(args.profile)
+    if args.report is not None:
+        profiler.writeReport(args.report)
+    print(json.dumps(summary))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,6 @@
-from itertools import count;
+import sys
+
+from player import Player
 
 global_index = 1
 global_bank_fee = 1
@@ -6,40 +8,27 @@ global_bank_win = 2
 global_bank_lose = 3
 
 
-class AlwaysReciprocatePlayer:
-    _ids = count(0)
+class AlwaysReciprocatePlayer(Player):
+    __slots__ = ()
+    typeCode = 2
+    bank = sys.modules[__name__]
+    # what it answers to everyone
+    decision = True
 
     def __init__(self, trustor_or_trustee, trust_coefficient, beta):
         global global_bank_fee
         global_bank_fee = beta
-        self.id = next(self._ids)
-        self.trustor = trustor_or_trustee
-        self.currency = 0
-
-    def changeTrustStatus(self):
-        self.trustor = not self.trustor
+        Player.__init__(self, trustor_or_trustee)
 
     def reciprocate(self, other):
-        return True
-
-    def updateCurrency(self, win_lose):
-        if self.trustor:
-            if win_lose:
-                self.currency += global_bank_win
-            else:
-                self.currency -= global_bank_fee
-        else:
-            if win_lose:
-                self.currency += global_bank_win
-            else:
-                self.currency += global_bank_lose
+        return self.decision
 
     def __repr__(self):
         return "Always Reciprocates Player ID: " + str(
             self.id) + "\n" + "Currency: " + str(
-            self.currency) + "\nIs truster? " + self.trustor
+            self.currency) + "\nIs truster? " + str(self.trustor)
 
     def __str__(self):
         return "Always Reciprocates Player ID: " + str(
             self.id) + "\n" + "Currency: " + str(
-            self.currency) + "\nIs truster? " + self.trustor
\ No newline at end of file
+            self.currency) + "\nIs truster? " + str(self.trustor)
\ No newline at end of file
@@ -1,61 +1,81 @@
-from itertools import count
+import sys
+
+import numpy as np
+
+from player import Player
 
 global_index = 1
 global_bank_fee = 1
 global_bank_win = 2
 global_bank_lose = 3
 
+# share of 1 + bank fee an estimation has to reach to trust
+TRUST_THRESHOLD = 0.66
+
 
-class smartPlayer:
-    _ids = count(0)
+class smartPlayer(Player):
+    __slots__ = ("trustingCoefficient", "store", "memory")
+    typeCode = 0
+    bank = sys.modules[__name__]
 
-    def __init__(self, trustor_or_trustee, trust_coefficient, beta):
+    def __init__(self, trustor_or_trustee, trust_coefficient, beta,
+                 store=None):
         global global_bank_fee
         global_bank_fee = beta
-        self.id = next(self._ids)
-        self.trustor = trustor_or_trustee
+        Player.__init__(self, trustor_or_trustee)
         self.trustingCoefficient = trust_coefficient
+        # estimations live in the shared trust store when one is given, in a
+        # per-player dict otherwise
+        self.store = store
         self.memory = {}
-        self.currency = 0
 
-    def changeTrustStatus(self):
-        self.trustor = not self.trustor
+    @staticmethod
+    def threshold(fee):
+        """ the estimation needed to trust with bank fee "fee" """
+        return TRUST_THRESHOLD * (1 + fee)
+
+    @staticmethod
+    def trustFactor(coefficient, result):
+        """ the factor an estimation is scaled by when the opponent's
+            decision was "result"; element-wise for arrays
+        """
+        return np.where(result, coefficient, 1 - coefficient)
 
     def reciprocate(self, other):
-        alreadyIn = False
-        for key in self.memory.keys():
-            if key == other.id:
-                alreadyIn = True
-        if not alreadyIn:
-            self.memory[other.id] = self.trustingCoefficient
-        ans = self.memory[other.id] >= 0.66 * (1 + global_bank_fee)
+        if self.store is not None:
+            mem = self.store.get(self.id, other.id, self.trustingCoefficient)
+        else:
+            if other.id not in self.memory:
+                self.memory[other.id] = self.trustingCoefficient
+            mem = self.memory[other.id]
+        ans = mem >= self.threshold(global_bank_fee)
         if not ans and self.trustor:
             self.currency -= global_bank_fee
         return ans
 
-    def updateCurrency(self, win_lose):
-        if self.trustor:
-            if win_lose:
-                self.currency += global_bank_win
-            else:
-                self.currency -= global_bank_fee
+    def updateTrustStatus(self, other, result):
+        factor = float(self.trustFactor(self.trustingCoefficient, result))
+        if self.store is not None:
+            self.store.scale(self.id, other.id, factor)
         else:
-            if win_lose:
-                self.currency += global_bank_win
-            else:
-                self.currency += global_bank_lose
+            self.memory[other.id] *= factor
 
-    def updateTrustStatus(self, other, result):
-        if result:
-            self.memory[other.id] *= self.trustingCoefficient
+    def estimations(self):
+        """ returns the known estimations as {player id: trust} """
+        if self.store is not None:
+            return self.store.row(self.id)
+        return dict(self.memory)
+
+    def setEstimation(self, pid, value):
+        if self.store is not None:
+            self.store.set(self.id, pid, value)
         else:
-            self.memory[other.id] *= (1 - self.trustingCoefficient)
+            self.memory[pid] = value
 
     def memoryPrint(self):
-        repstr = []
-        i = 0
-        for pid, mem in self.memory.items():
-            repstr[i] = "Player ID: " + pid + ", Trusting Status: " + mem
+        repstr = ""
+        for pid, mem in self.estimations().items():
+            repstr += "Player ID: {0}, Trusting Status: {1}\n".format(pid, mem)
         return repstr
 
     def __repr__(self):
@@ -0,0 +1,243 @@
+""" Reproducible performance benchmarks.
+
+    python benchmark.py run [-o results.json] [--group match] [--quick]
+    python benchmark.py compare baseline.json results.json [--threshold 0.1]
+
+    Three groups are measured:
+      match    runMatch and MatchEngine throughput for mixes of player types,
+               with the engine playing every match and with fixed matches
+               in closed form
+      shuffle  bansal_shuffle convergence for graph sizes and target GCCs
+      graph    graph.Graph.edges() scaling and Agent.runSimulation end to end
+               at 10^2, 10^3 and 10^4 players
+
+    Every case is run with a fixed seed and timed "repeat" times, keeping the
+    fastest run. compare flags every case that got slower by more than the
+    threshold and exits with status 1 if there is one.
+"""
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+import numpy as np
+
+import Agent
+import clusterRandNetwork
+from AlwaysReciprocatePlayer import AlwaysReciprocatePlayer
+from NonReciprocativePlayer import NonReciprocativePlayer
+from RandomPlayer import RandomPlayer
+from SmartPlayer import smartPlayer
+from csrGraph import CSRGraph
+from graph import Graph
+from matchEngine import MatchEngine
+from player import registry
+
+# trusters are always smart players, trustees are drawn from these mixes
+MIXES = {
+    "smart": {"smart": 1.},
+    "random": {"random": 1.},
+    "bots": {"random": 1 / 3., "always": 1 / 3., "never": 1 / 3.},
+    "mixed": {"smart": .25, "random": .25, "always": .25, "never": .25},
+}
+
+
+def _timed(fn, repeat):
+    """ returns the fastest of "repeat" runs of fn() and its last result """
+    best = float("inf")
+    result = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _population(mix, trusters, trustees, seed):
+    random.seed(seed)
+    registry.reset()
+    Agent.global_beta = 0.3
+    makers = {
+        "smart": lambda: smartPlayer(False, 0.9, 0.3),
+        "random": lambda: RandomPlayer(False, 0.9),
+        "always": lambda: AlwaysReciprocatePlayer(False, None, 0.3),
+        "never": lambda: NonReciprocativePlayer(False, None),
+    }
+    p1 = [smartPlayer(True, 0.9, 0.3) for i in range(trusters)]
+    p2 = []
+    for name, share in sorted(mix.items()):
+        p2 += [makers[name]() for i in range(int(round(share * trustees)))]
+    return p1, p2
+
+
+def benchMatch(repeat, quick):
+    results = {}
+    side = 20 if quick else 60
+    rounds = 5
+    for name, mix in sorted(MIXES.items()):
+        def objects():
+            trusters, trustees = _population(mix, side, side, 1)
+            for r in range(rounds):
+                for truster in trusters:
+                    for trustee in trustees:
+                        Agent.runMatch(truster, trustee)
+            return rounds * len(trusters) * len(trustees)
+
+        def engine(closedForm=False):
+            trusters, trustees = _population(mix, side, side, 1)
+            e = MatchEngine(trusters + trustees)
+            p1 = np.repeat(e.indicesOf(trusters), len(trustees))
+            p2 = np.tile(e.indicesOf(trustees), len(trusters))
+            e.runRounds(rounds, p1, p2, closedForm=closedForm)
+            return rounds * len(p1)
+
+        for label, fn in (("runMatch", objects), ("engine", engine),
+                          ("engineClosedForm",
+                           lambda: engine(closedForm=True))):
+            seconds, matches = _timed(fn, repeat)
+            results["match/%s/%s" % (label, name)] = {
+                "seconds": seconds, "matches": matches,
+                "matchesPerSecond": matches / seconds}
+    return results
+
+
+def _randomGraph(n, degree, seed):
+    gen = np.random.RandomState(seed)
+    m = n * degree // 2
+    edges = gen.randint(0, n, size=(m, 2))
+    return CSRGraph.fromEdges(n, edges)
+
+
+def benchShuffle(repeat, quick):
+    results = {}
+    sizes = (200, 1000) if quick else (200, 1000, 5000)
+    for n in sizes:
+        for target in (0.05, 0.2):
+            csr = _randomGraph(n, 8, n)
+
+            def shuffle():
+                return clusterRandNetwork.bansal_shuffle(
+                    csr.toShuffleGraph(), target, seed=0, incremental=True,
+                    maxiter=200000)
+
+            seconds, (G, niter, gcc) = _timed(shuffle, repeat)
+            results["shuffle/n=%d/gcc=%g" % (n, target)] = {
+                "seconds": seconds, "iterations": niter, "gcc": gcc,
+                "iterationsPerSecond": niter / seconds}
+    return results
+
+
+def benchGraph(repeat, quick):
+    results = {}
+    sizes = (100, 1000) if quick else (100, 1000, 10000)
+    for n in sizes:
+        def build():
+            g = Graph()
+            for i in range(n):
+                g.add_vertex(i)
+            half = n // 2
+            for i in range(n * 4):
+                g.add_edge((i % half, half + (i * 7) % half))
+            for i in range(10):
+                g.edges()
+            return len(g.edges())
+
+        seconds, edges = _timed(build, repeat)
+        results["graph/edges/n=%d" % n] = {"seconds": seconds,
+                                           "edges": edges}
+
+        def simulate():
+            return Agent.runSimulation(n, n // 2, 0.9, 0.3, 3, seed=0)
+
+        seconds, summary = _timed(simulate, repeat)
+        results["graph/endToEnd/n=%d" % n] = {
+            "seconds": seconds, "smartCurrency": summary["smartCurrency"]}
+    return results
+
+
+GROUPS = {"match": benchMatch, "shuffle": benchShuffle, "graph": benchGraph}
+
+
+def run(groups, repeat=3, quick=False):
+    results = {}
+    for name in groups:
+        results.update(GROUPS[name](repeat, quick))
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "repeat": repeat,
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    """ returns (name, old seconds, new seconds, ratio) for every case of
+        "current" that is more than "threshold" slower than in "baseline"
+    """
+    regressions = []
+    for name, result in sorted(current["results"].items()):
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        ratio = result["seconds"] / old["seconds"]
+        if ratio > 1 + threshold:
+            regressions.append((name, old["seconds"], result["seconds"],
+                                ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TrustGame benchmarks")
+    commands = parser.add_subparsers(dest="command")
+    runParser = commands.add_parser("run", help="run the benchmarks")
+    runParser.add_argument("-o", "--out", default="benchmark.json")
+    runParser.add_argument("-g", "--group", action="append",
+                           choices=sorted(GROUPS),
+                           help="group to run, may be repeated "
+                                "(default: all)")
+    runParser.add_argument("-r", "--repeat", type=int, default=3)
+    runParser.add_argument("--quick", action="store_true",
+                           help="smaller sizes, for a fast sanity check")
+    compareParser = commands.add_parser(
+        "compare", help="flag regressions against a baseline")
+    compareParser.add_argument("baseline")
+    compareParser.add_argument("current")
+    compareParser.add_argument("-t", "--threshold", type=float, default=0.1,
+                               help="allowed slowdown, 0.1 is 10%%")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.group or sorted(GROUPS), args.repeat, args.quick)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        for name, result in sorted(report["results"].items()):
+            print("%-40s %10.4fs" % (name, result["seconds"]))
+        return 0
+
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold)
+        for name, old, new, ratio in regressions:
+            print("REGRESSION %-40s %.4fs -> %.4fs (x%.2f)" % (name, old, new,
+                                                               ratio))
+        if not regressions:
+            print("no regressions")
+        return 1 if regressions else 0
+
+    parser.print_help()
+    return 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
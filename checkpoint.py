@@ -0,0 +1,147 @@
+""" Checkpoint and resume of running simulations.
+
+    A checkpoint is a directory holding the mutable engine state (currency,
+    the trust buffer, the remaining warmup matches), the match pairs of the
+    network and the state of the engine's and the scheduler's generators.
+    Arrays are written as raw .npy files and memory-mapped when loaded, so
+    taking a checkpoint is a few sequential writes and does not pickle any
+    objects.
+
+    Checkpoints are written to a temporary directory and renamed into place,
+    and the "latest" file is replaced atomically, so a crash while saving
+    leaves the previous checkpoint usable.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+
+LATEST = "latest"
+
+# parameters that must match for a run to be resumed from a checkpoint
+STATE_PARAMETERS = ["smarts", "trusters", "coeff", "beta", "rounds",
+                    "networkType", "clusterCoefficient", "randoms", "recs",
+                    "nonRecs", "warmupRounds", "seed", "topology",
+                    "meanDegree", "shuffleChains", "schedule", "eventRate",
+                    "participation", "convergence", "convergenceTolerance",
+                    "convergencePatience", "strategies", "closedForm"]
+
+
+class Checkpoint(object):
+
+    def __init__(self, path, state, arrays):
+        self.path = path
+        self.state = state
+        self.arrays = arrays
+
+    @property
+    def round(self):
+        """ number of rounds completed when the checkpoint was taken """
+        return self.state["round"]
+
+    def checkParameters(self, params):
+        """ raises ValueError unless params describe the checkpointed run """
+        for key in STATE_PARAMETERS:
+            if self.state["params"].get(key) != params.get(key):
+                raise ValueError(
+                    "cannot resume: {0} is {1!r} in the checkpoint but {2!r} "
+                    "now".format(key, self.state["params"].get(key),
+                                 params.get(key)))
+
+    def restore(self, engine, scheduler=None, convergence=None):
+        """ copies the saved state into the engine, the scheduler and the
+            convergence detector
+        """
+        engine.currency[...] = self.arrays["currency"]
+        engine.trust.restore(self.arrays["trust"])
+        engine.warmupMatches = self.state["warmupMatches"]
+        if self.state.get("engineRng") is not None:
+            engine.rng.bit_generator.state = self.state["engineRng"]
+        if scheduler is not None and \
+                self.state.get("scheduleRng") is not None:
+            scheduler.rng.bit_generator.state = self.state["scheduleRng"]
+        if convergence is not None and \
+                self.state.get("convergence") is not None:
+            convergence.restore(self.state["convergence"], dict(
+                (key[len("convergence."):], array)
+                for key, array in self.arrays.items()
+                if key.startswith("convergence.")))
+
+
+def save(directory, round, engine, p1, p2, params, eventChunks=0,
+         logOffset=0, statsState=None, keep=2, scheduler=None,
+         convergence=None):
+    """ writes a checkpoint after "round" completed rounds and returns its
+        path; only the newest "keep" checkpoints are kept. eventChunks and
+        logOffset record how much of the event and text logs belong to the
+        checkpointed rounds, statsState is the round statistics collector's
+    """
+    name = "round-{0:09d}".format(round)
+    path = os.path.join(directory, name)
+    tmp = path + ".tmp"
+    if os.path.isdir(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    arrays = {
+        "currency": engine.currency,
+        "trust": engine.trust.buffer(),
+        "p1": np.asarray(p1),
+        "p2": np.asarray(p2),
+    }
+    convergenceState = None
+    if convergence is not None:
+        convergenceState, convergenceArrays = convergence.state()
+        for key, array in convergenceArrays.items():
+            arrays["convergence." + key] = array
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp, key + ".npy"), array)
+    state = {
+        "round": round,
+        "warmupMatches": int(engine.warmupMatches),
+        "params": dict((key, params.get(key)) for key in STATE_PARAMETERS),
+        "eventChunks": eventChunks,
+        "logOffset": logOffset,
+        "stats": statsState,
+        "engineRng": (engine.rng.bit_generator.state
+                      if engine.rng is not None else None),
+        "scheduleRng": (scheduler.rng.bit_generator.state
+                        if scheduler is not None and
+                        scheduler.rng is not None else None),
+        "convergence": convergenceState,
+    }
+    with open(os.path.join(tmp, "state.json"), "w") as f:
+        json.dump(state, f)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.rename(tmp, path)
+
+    latest = os.path.join(directory, LATEST)
+    with open(latest + ".tmp", "w") as f:
+        f.write(name)
+    os.replace(latest + ".tmp", latest)
+
+    old = sorted(entry for entry in os.listdir(directory)
+                 if entry.startswith("round-") and not entry.endswith(".tmp"))
+    for entry in old[:-keep]:
+        shutil.rmtree(os.path.join(directory, entry))
+    return path
+
+
+def load(directory):
+    """ returns the latest checkpoint in directory, or None if there is none.
+        Arrays are memory-mapped read-only
+    """
+    latest = os.path.join(directory, LATEST)
+    if not os.path.exists(latest):
+        return None
+    with open(latest) as f:
+        path = os.path.join(directory, f.read().strip())
+    with open(os.path.join(path, "state.json")) as f:
+        state = json.load(f)
+    arrays = {}
+    for entry in os.listdir(path):
+        if entry.endswith(".npy"):
+            arrays[entry[:-4]] = np.load(os.path.join(path, entry),
+                                         mmap_mode="r")
+    return Checkpoint(path, state, arrays)
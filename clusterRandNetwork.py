@@ -1,12 +1,18 @@
 # Copyright 2014 Alistair Muldal <alistair.muldal@pharm.ox.ac.uk>
 
+import warnings
+
 import numpy as np
-import jgraph
 from itertools import combinations, product
+from multiprocessing import Event, Pool, cpu_count
+
+from csrGraph import IN, OUT, ShuffleGraph, SwapAdjacency
 
 
 def bansal_shuffle(G, target_gcc, tol=1E-3, maxiter=None, inplace=True,
-                   require_connected=False, seed=None, verbose=False):
+                   require_connected=False, seed=None, verbose=False,
+                   incremental=False, callback=None, batch_size=32,
+                   max_stall=None):
     r"""
     Bansal et al's Markov chain method for generating random graphs with
     prescribed global clustering coefficients.
@@ -24,13 +30,26 @@ def bansal_shuffle(G, target_gcc, tol=1E-3, maxiter=None, inplace=True,
     The rewiring step can either introduce a new triangle or break up an
     existing one depending on whether the current GCC is greater or smaller
     than the target value. If rewiring brings the GCC closer to the target
-    value then G' is used in the next iteration. The algorithm halts either
-    when the GCC is sufficiently close to the target value, or when a maximum
-    number of iterations is reached.
+    value then G' is used in the next iteration. The algorithm halts when the
+    GCC is sufficiently close to the target value, when a maximum number of
+    iterations is reached or when the GCC has not improved for max_stall
+    iterations; the last two warn and return the closest graph found.
+
+    In incremental mode the rewiring is applied to G in place and undone when
+    it does not help, and the GCC is tracked from running triangle and
+    connected-triple counts instead of being recomputed. A double edge swap
+    preserves the degree sequence, so the number of connected triples never
+    changes and only the triangles through the four rewired edges need to be
+    counted, which makes each step O(degree) rather than O(V + E).
+
+    For undirected graphs the motifs are proposed in batches of random
+    (x, y1, y2, z1, z2) tuples drawn from a sorted
+    adjacency array (csrGraph.SwapAdjacency), checked with vectorized
+    adjacency tests, and the first valid one is rewired.
 
     Arguments:
     ----------
-        G: igraph.Graph
+        G: igraph.Graph or csrGraph.ShuffleGraph
             input graph to be shuffled; can be either undirected or directed
         target_gcc: float
             target global clustering coefficient
@@ -43,14 +62,30 @@ def bansal_shuffle(G, target_gcc, tol=1E-3, maxiter=None, inplace=True,
         require_connected: bool
             impose the additional constraint that G' must be connected on each
             rewiring step, in which case the input graph must also be connected
-        seed: int
-            seed for the random number generator, see numpy.random.RandomState
+        seed: int, numpy.random.SeedSequence or numpy.random.RandomState
+            seed for the random number generator, see numpy.random.RandomState;
+            a SeedSequence seeds a PCG64 stream, a RandomState is used as is
         verbose: bool
             print convergence messages
+        incremental: bool
+            track triangle counts under each swap instead of copying G and
+            recomputing its transitivity; G must be undirected and simple
+        callback: callable
+            called as callback(niter, gcc_best) after every rewiring step,
+            e.g. to report progress; the shuffle stops early when it returns
+            True
+        batch_size: int
+            number of motifs first proposed at once for undirected graphs,
+            doubled whenever a whole batch fails, up to _BATCH_PER_EDGE
+            motifs per edge; a step that finds no motif in the largest batch
+            rewires nothing
+        max_stall: int
+            give up after this many iterations in a row without getting
+            closer to the target (default is no limit)
 
     Returns:
     --------
-        G_shuf: igraph.Graph
+        G_shuf: igraph.Graph or csrGraph.ShuffleGraph
             shuffled graph, has the same same degree sequence(s) as G
         niter: int
             total rewiring iterations performed
@@ -76,11 +111,23 @@ def bansal_shuffle(G, target_gcc, tol=1E-3, maxiter=None, inplace=True,
     if not inplace:
         G = G.copy()
 
+    if incremental and G.is_directed():
+        raise ValueError('incremental mode requires an undirected graph')
+
     # seed RNG
-    gen = np.random.RandomState(seed)
+    if isinstance(seed, np.random.RandomState):
+        gen = seed
+    elif isinstance(seed, np.random.SeedSequence):
+        gen = np.random.RandomState(np.random.PCG64(seed))
+    else:
+        gen = np.random.RandomState(seed)
 
     # get initial GCC and loss
     gcc_initial = 0
+    if incremental:
+        triangles = _count_triangles(G)
+        triples = _count_triples(G.degree())
+        gcc_initial = _gcc(triangles, triples)
     gcc = gcc_best = gcc_initial
     loss = loss_best = target_gcc - gcc
 
@@ -93,36 +140,91 @@ def bansal_shuffle(G, target_gcc, tol=1E-3, maxiter=None, inplace=True,
     degrees = G.degree()
     candidate_x = _filter_by_degree(range(G.vcount()), degrees, 2)
 
+    # without them there is no triplet to rewire
+    if len(candidate_x) == 0:
+        warnings.warn('no vertex has degree 2 or more, cannot reach target '
+                      'GCC %g from %g' % (target_gcc, gcc), RuntimeWarning,
+                      stacklevel=2)
+        return G, 0, gcc
+
+    # undirected graphs are searched in batches. degrees are invariant, so
+    # the candidates are fixed
+    sampler = None
+    if not G.is_directed():
+        sampler = SwapAdjacency.fromGraph(G)
+        sampler.candidates = np.asarray(candidate_x, dtype=np.int64)
+        sampler.batch_size = batch_size
+        sampler.max_batch = max(batch_size, min(
+            _MAX_BATCH, _BATCH_PER_EDGE * G.ecount()))
+
     niter = 0
+    stall = 0
     terminating = False
 
     while not terminating:
 
-        # for moderately-sized graphs it's faster to modify a deep copy of G
-        # than to undo the rewiring whenever the GCC does not improve
-        G_prime = G.copy()
+        if incremental:
 
-        if loss > 0:
-            _make_triangle(G_prime, candidate_x, gen)
+            swap = None
+            if loss > 0:
+                swap = _make_triangle(G, candidate_x, gen, sampler)
 
-        elif loss < 0:
-            _break_triangle(G_prime, candidate_x, gen)
+            elif loss < 0:
+                swap = _break_triangle(G, candidate_x, gen, sampler)
 
-        # compute the new clustering coefficient and loss
-        gcc = G_prime.transitivity_undirected()
-        loss = target_gcc - gcc
+            if swap is not None:
+                triangles += swap[2]
 
-        # did we improve?
-        improved = abs(loss) < abs(loss_best)
+            gcc = _gcc(triangles, triples)
+            loss = target_gcc - gcc
+
+            improved = abs(loss) < abs(loss_best)
+
+            if require_connected:
+                improved &= G.is_connected()
+
+            if improved:
+                gcc_best = gcc
+                loss_best = loss
+
+            elif swap is not None:
+                # undo the rewiring
+                removed, added, _ = swap
+                triangles += _double_edge_swap(G, added, removed, sampler)
+
+        else:
 
-        # if desired, we also confirm that the new graph is connected
-        if require_connected:
-            improved &= G_prime.is_connected()
+            # for moderately-sized graphs it's faster to modify a deep copy of
+            # G than to undo the rewiring whenever the GCC does not improve
+            G_prime = G.copy()
 
-        if improved:
-            gcc_best = gcc
-            loss_best = loss
-            G = G_prime
+            swap = None
+            if loss > 0:
+                swap = _make_triangle(G_prime, candidate_x, gen, sampler)
+
+            elif loss < 0:
+                swap = _break_triangle(G_prime, candidate_x, gen, sampler)
+
+            # compute the new clustering coefficient and loss
+            gcc = G_prime.transitivity_undirected()
+            loss = target_gcc - gcc
+
+            # did we improve?
+            improved = abs(loss) < abs(loss_best)
+
+            # if desired, we also confirm that the new graph is connected
+            if require_connected:
+                improved &= G_prime.is_connected()
+
+            if improved:
+                gcc_best = gcc
+                loss_best = loss
+                G = G_prime
+
+            elif swap is not None and sampler is not None:
+                # G_prime is dropped, take the rewiring back out of the index
+                removed, added, _ = swap
+                sampler.swap(added, removed)
 
         # print progress
         if verbose:
@@ -130,22 +232,158 @@ def bansal_shuffle(G, target_gcc, tol=1E-3, maxiter=None, inplace=True,
                   % (niter, gcc, loss, improved))
 
         niter += 1
+        stall = 0 if improved else stall + 1
+
+        stopped = callback is not None and callback(niter, gcc_best)
 
         # check termination conditions
         if abs(loss_best) < tol:
             terminating = True
+        elif stopped:
+            terminating = True
         elif niter >= maxiter:
-            print('failed to reach targed GCC within maxiter')
+            warnings.warn('failed to reach target GCC %g within maxiter, '
+                          'stopped at %g' % (target_gcc, gcc_best),
+                          RuntimeWarning, stacklevel=2)
+            terminating = True
+        elif max_stall is not None and stall >= max_stall:
+            warnings.warn('GCC stopped improving at %g, target %g'
+                          % (gcc_best, target_gcc), RuntimeWarning,
+                          stacklevel=2)
             terminating = True
 
     return G, niter, gcc_best
 
 
-def _make_triangle(G, candidate_x, gen):
+def parallel_bansal_shuffle(G, target_gcc, chains=4, tol=1E-3, maxiter=None,
+                            seed=None, workers=None, trace_every=100,
+                            batch_size=32, max_stall=None):
+    r"""
+    Runs "chains" independently seeded incremental bansal_shuffle chains on
+    a process pool, all starting from G. As soon as one chain gets within
+    tol of the target, or uses up its maxiter steps, the others are told to
+    stop; a chain also ends on its own after max_stall steps without
+    improvement. The chain closest to the target wins, with a RuntimeWarning
+    if it did not get within tol.
+
+    Which chain wins can depend on the timing of the workers, so unlike
+    bansal_shuffle the result is not determined by the seed alone.
+
+    Arguments:
+    ----------
+        G: igraph.Graph, csrGraph.ShuffleGraph or csrGraph.CSRGraph
+            undirected input graph, it is not modified
+        target_gcc, tol, batch_size, max_stall:
+            as for bansal_shuffle
+        maxiter: int
+            rewiring steps of every chain (default _STEPS_PER_EDGE per edge
+            of G); the shuffle always ends
+        chains: int
+            number of Markov chains
+        seed: int or numpy.random.SeedSequence
+            master seed, every chain gets a spawned child sequence
+        workers: int
+            worker processes (default: one per chain, at most all cores)
+        trace_every: int
+            record each chain's best GCC every this many steps
+
+    Returns:
+    --------
+        G_shuf: csrGraph.ShuffleGraph
+            shuffled graph of the winning chain
+        niter: int
+            rewiring iterations performed by the winning chain
+        gcc_best: float
+            final global clustering coefficient of the winning chain
+        traces: list of numpy.ndarray
+            per chain, an (k, 2) array of (niter, gcc_best) samples
+    """
+    if G.is_directed():
+        raise ValueError('parallel shuffling requires an undirected graph')
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    if hasattr(G, "edgeArray"):
+        edges = np.asarray(G.edgeArray())
+    else:
+        edges = np.array(G.get_edgelist())
+    if maxiter is None or maxiter == np.inf:
+        maxiter = _STEPS_PER_EDGE * len(edges)
+    tasks = [(chain, G.vcount(), edges, target_gcc, tol, maxiter, child,
+              trace_every, batch_size, max_stall)
+             for chain, child in enumerate(seed.spawn(chains))]
+    if workers is None:
+        workers = min(chains, cpu_count())
+    stop = Event()
+    with Pool(workers, initializer=_init_chain, initargs=(stop,)) as pool:
+        results = pool.map(_run_chain, tasks)
+    results.sort(key=lambda result: (abs(target_gcc - result[3]), result[0]))
+    chain, best_edges, niter, gcc_best, _ = results[0]
+    if abs(target_gcc - gcc_best) >= tol:
+        warnings.warn('no chain reached target GCC %g, the best stopped at %g'
+                      % (target_gcc, gcc_best), RuntimeWarning, stacklevel=2)
+    results.sort(key=lambda result: result[0])
+    traces = [result[4] for result in results]
+    G_shuf = ShuffleGraph(G.vcount(), best_edges, getattr(G, "players", None))
+    return G_shuf, niter, gcc_best, traces
+
+
+# default rewiring steps per edge of every parallel chain
+_STEPS_PER_EDGE = 100
+
+_stop_chains = None
+
+
+def _init_chain(stop):
+    global _stop_chains
+    _stop_chains = stop
+
+
+def _run_chain(task):
+    """
+    one chain of parallel_bansal_shuffle, run in a worker process
+    """
+    (chain, n, edges, target_gcc, tol, maxiter, seed, trace_every,
+     batch_size, max_stall) = task
+    G = ShuffleGraph(n, edges)
+    trace = []
+
+    def callback(niter, gcc_best):
+        if niter % trace_every:
+            return False
+        trace.append((niter, gcc_best))
+        return _stop_chains.is_set()
+
+    with warnings.catch_warnings():
+        # the parent warns once for the winning chain
+        warnings.simplefilter('ignore', RuntimeWarning)
+        G, niter, gcc_best = bansal_shuffle(G, target_gcc, tol=tol,
+                                            maxiter=maxiter, seed=seed,
+                                            incremental=True,
+                                            callback=callback,
+                                            batch_size=batch_size,
+                                            max_stall=max_stall)
+    if abs(target_gcc - gcc_best) < tol or niter >= maxiter:
+        _stop_chains.set()
+    trace.append((niter, gcc_best))
+    return chain, G.edgeArray(), niter, gcc_best, np.array(trace)
+
+
+def _make_triangle(G, candidate_x, gen, sampler=None):
     """
-    create at least one triangle motif by rewiring two edges
+    create at least one triangle motif by rewiring two edges; returns the
+    removed and added edges and the change in triangles, or None when the
+    batched search finds no motif to rewire
     """
 
+    if sampler is not None:
+        motif = _sample_make_triangle(sampler, gen)
+        if motif is None:
+            return None
+        x, y1, y2, z1, z2 = motif
+        removed = [(y1, z1), (z2, y2)]
+        added = [(y1, y2), (z2, z1)]
+        return removed, added, _double_edge_swap(G, removed, added, sampler)
+
     have_rewire_candidates = False
 
     # get candidate edges to rewire
@@ -179,10 +417,10 @@ def _make_triangle(G, candidate_x, gen):
                     continue
 
                 # find all outputs from y1
-                from_y1 = G.neighbors(y1, igraph.OUT)
+                from_y1 = G.neighbors(y1, OUT)
 
                 # find all inputs to y2
-                to_y2 = G.neighbors(y2, igraph.IN)
+                to_y2 = G.neighbors(y2, IN)
 
                 # shuffle them
                 gen.shuffle(from_y1)
@@ -205,17 +443,25 @@ def _make_triangle(G, candidate_x, gen):
                     break
 
     # perform double edge swap
-    G.delete_edges([(y1, z1), (z2, y2)])
-    G.add_edges([(y1, y2), (z2, z1)])
-
-    pass
+    removed = [(y1, z1), (z2, y2)]
+    added = [(y1, y2), (z2, z1)]
+    return removed, added, _double_edge_swap(G, removed, added)
 
 
-def _break_triangle(G, candidate_x, gen):
+def _break_triangle(G, candidate_x, gen, sampler=None):
     """
     destroy at least one triangle by rewiring two edges
     """
 
+    if sampler is not None:
+        motif = _sample_break_triangle(sampler, gen)
+        if motif is None:
+            return None
+        x, y1, y2, z1, z2 = motif
+        removed = [(y1, y2), (z2, z1)]
+        added = [(y1, z1), (z2, y2)]
+        return removed, added, _double_edge_swap(G, removed, added, sampler)
+
     have_rewire_candidates = False
     n_edges = G.ecount()
 
@@ -270,10 +516,118 @@ def _break_triangle(G, candidate_x, gen):
                     break
 
     # perform double edge swap
-    G.delete_edges([(y1, y2), (z2, z1)])
-    G.add_edges([(y1, z1), (z2, y2)])
+    removed = [(y1, y2), (z2, z1)]
+    added = [(y1, z1), (z2, y2)]
+    return removed, added, _double_edge_swap(G, removed, added)
+
+
+# largest batch of motifs proposed before a rewiring step gives up, per
+# edge of the graph and overall
+_BATCH_PER_EDGE = 4
+_MAX_BATCH = 1 << 16
+
 
-    pass
+def _sample_make_triangle(sampler, gen):
+    """
+    propose batches of motifs x-y1, x-y2, y1-z1, y2-z2 until one has y1, y2
+    and z1, z2 unconnected, z1 != z2 and x not in (z1, z2); returns it, or
+    None if not even a batch of sampler.max_batch motifs had one
+    """
+    batch = sampler.batch_size
+    while True:
+        x = sampler.candidates[gen.randint(0, len(sampler.candidates), batch)]
+        y1 = sampler.randomNeighbors(x, gen.random_sample(batch))
+        y2 = sampler.randomNeighbors(x, gen.random_sample(batch))
+        z1 = sampler.randomNeighbors(y1, gen.random_sample(batch))
+        z2 = sampler.randomNeighbors(y2, gen.random_sample(batch))
+        ok = (y1 != y2) & (z1 != x) & (z2 != x) & (z1 != z2)
+        idx = np.flatnonzero(ok)
+        idx = idx[~sampler.connected(y1[idx], y2[idx])]
+        idx = idx[~sampler.connected(z1[idx], z2[idx])]
+        if len(idx):
+            k = idx[0]
+            return int(x[k]), int(y1[k]), int(y2[k]), int(z1[k]), int(z2[k])
+        if batch >= sampler.max_batch:
+            return None
+        batch = min(2 * batch, sampler.max_batch)
+
+
+def _sample_break_triangle(sampler, gen):
+    """
+    propose batches of triangles x, y1, y2 each with a random edge z2-z1
+    until one edge has no endpoint connected to x, y1 or y2; returns it, or
+    None if not even a batch of sampler.max_batch proposals had one
+    """
+    batch = sampler.batch_size
+    n_slots = len(sampler.keys)
+    while True:
+        x = sampler.candidates[gen.randint(0, len(sampler.candidates), batch)]
+        y1 = sampler.randomNeighbors(x, gen.random_sample(batch))
+        y2 = sampler.randomNeighbors(x, gen.random_sample(batch))
+        z2, z1 = sampler.randomEdges(gen.randint(0, n_slots, batch))
+        idx = np.flatnonzero(y1 != y2)
+        idx = idx[sampler.connected(y1[idx], y2[idx])]
+        # x, y1 and y2 are each other's neighbours, so this also keeps z1
+        # and z2 out of the triangle itself
+        for a in (x, y1, y2):
+            for z in (z1, z2):
+                idx = idx[~sampler.connected(a[idx], z[idx])]
+        if len(idx):
+            k = idx[0]
+            return int(x[k]), int(y1[k]), int(y2[k]), int(z1[k]), int(z2[k])
+        if batch >= sampler.max_batch:
+            return None
+        batch = min(2 * batch, sampler.max_batch)
+
+
+def _double_edge_swap(G, removed, added, sampler=None):
+    """
+    delete the edges in removed, then add the edges in added; returns the
+    resulting change in the number of (undirected) triangles
+    """
+    if sampler is not None:
+        delta = sampler.swap(removed, added)
+        G.delete_edges(removed)
+        G.add_edges(added)
+        return delta
+    nbrs = {}
+    for (a, b) in removed + added:
+        for v in (a, b):
+            if v not in nbrs:
+                nbrs[v] = set(G.neighbors(v))
+    delta = 0
+    for (a, b) in removed:
+        nbrs[a].discard(b)
+        nbrs[b].discard(a)
+        delta -= len(nbrs[a] & nbrs[b])
+    for (a, b) in added:
+        delta += len(nbrs[a] & nbrs[b])
+        nbrs[a].add(b)
+        nbrs[b].add(a)
+    G.delete_edges(removed)
+    G.add_edges(added)
+    return delta
+
+
+def _count_triangles(G):
+    adj = [set(G.neighbors(v)) for v in range(G.vcount())]
+    total = 0
+    for v in range(len(adj)):
+        for u in adj[v]:
+            if u > v:
+                total += len(adj[v] & adj[u])
+    return total // 3
+
+
+def _count_triples(degrees):
+    degrees = np.asarray(degrees, dtype=np.int64)
+    return int((degrees * (degrees - 1) // 2).sum())
+
+
+def _gcc(triangles, triples):
+    if triples == 0:
+        return 0.
+    return 3. * triangles / triples
 
 
 def _filter_by_degree(indices, degrees, min_deg=2):
@@ -0,0 +1,151 @@
+""" Detection of stationary games and analytic fast-forward.
+
+    Trust updates are multiplicative, so estimations quickly fall below the
+    trusting threshold (or stay put) and the decisions of a game settle
+    long before its last round. ConvergenceDetector watches the matches
+    without a random player, whose outcome only depends on the trust state,
+    and counts the rounds in which none of their decisions changed:
+
+    - "settled" once the decisions did not change for "patience" rounds.
+      From then on every round repeats the currency changes of the last
+      one and scales every estimation by the same factor, so "forward" can
+      play any number of rounds at once with a multiply-add, up to the
+      round in which a decision could flip ("horizon"). Matches with a
+      random player are still played one round after another, so they draw
+      the same random decisions as without fast-forward.
+    - "stationary" once, in addition, no estimation moved by more than
+      "tolerance" in those rounds, i.e. the game has reached a fixed point
+      and can as well be stopped.
+
+    Fast-forward gives the same results as playing the rounds, up to the
+    rounding of the multiply-add. It needs the same matches every round
+    (the sync schedule with full participation) and the default strategy
+    of every player type.
+"""
+import numpy as np
+
+from matchEngine import typeNames
+from SmartPlayer import smartPlayer
+
+
+class ConvergenceDetector(object):
+
+    def __init__(self, engine, p1, p2, tolerance=1e-9, patience=10):
+        self.engine = engine
+        self.p1 = np.asarray(p1, dtype=np.intp)
+        self.p2 = np.asarray(p2, dtype=np.intp)
+        self.tolerance = tolerance
+        self.patience = patience
+        if [strategy.name for strategy in engine.strategies] != typeNames:
+            raise ValueError("convergence detection needs the default "
+                             "strategies")
+        random = engine.isRandom[self.p1] | engine.isRandom[self.p2]
+        self.fixed = np.flatnonzero(~random)
+        self.random = np.flatnonzero(random)
+        f1, f2 = self.p1[self.fixed], self.p2[self.fixed]
+        # the estimations the fixed matches decide on: p1's of p2 where p1
+        # is smart, then p2's of p1 where p2 is smart
+        self.smart1 = engine.isSmart[f1]
+        self.smart2 = engine.isSmart[f2]
+        self.rows = np.concatenate((f1[self.smart1], f2[self.smart2]))
+        self.cols = np.concatenate((f2[self.smart1], f1[self.smart2]))
+        self.reset()
+
+    def reset(self):
+        self.steady = 0
+        self.quiet = 0
+        self.decisions = None
+        self.trust = None
+
+    @property
+    def settled(self):
+        return self.steady >= self.patience
+
+    @property
+    def stationary(self):
+        return self.quiet >= self.patience
+
+    def update(self, p1Ans, p2Ans, p1Delta, p2Delta):
+        """ takes the outcome of a round of the matches p1, p2 """
+        engine = self.engine
+        decisions = np.concatenate((p1Ans[self.fixed], p2Ans[self.fixed]))
+        trust = engine.trust.lookup(self.rows, self.cols,
+                                    engine.coefficient[self.rows])
+        if self.decisions is None or engine.warmupMatches > 0 or \
+                not np.array_equal(decisions, self.decisions):
+            self.steady = self.quiet = 0
+        else:
+            self.steady += 1
+            if len(trust) == 0 or \
+                    np.abs(trust - self.trust).max() <= self.tolerance:
+                self.quiet += 1
+            else:
+                self.quiet = 0
+        self.decisions = decisions
+        self.trust = trust
+        self.p1Delta = p1Delta[self.fixed]
+        self.p2Delta = p2Delta[self.fixed]
+
+    def factors(self):
+        """ the factor every watched estimation is scaled by per round, as
+            MatchEngine._update would with the current decisions
+        """
+        engine = self.engine
+        m = len(self.fixed)
+        p1Ans, p2Ans = self.decisions[:m], self.decisions[m:]
+        rows = self.rows
+        # p1's estimation follows p2's answer, p2's estimation follows p1's
+        # trust, and neither changes unless p1 trusted
+        updated = np.concatenate((p1Ans[self.smart1], p1Ans[self.smart2]))
+        result = np.concatenate((p2Ans[self.smart1], p1Ans[self.smart2]))
+        return np.where(updated, smartPlayer.trustFactor(
+            engine.coefficient[rows], result), 1.)
+
+    def horizon(self):
+        """ number of rounds that can be fast-forwarded before a decision
+            of the fixed matches could change
+        """
+        if len(self.rows) == 0:
+            return np.iinfo(np.int64).max
+        factors = self.factors()
+        threshold = self.engine.threshold[self.rows]
+        moving = (factors != 1) & (self.trust > 0)
+        with np.errstate(divide="ignore"):
+            crossing = np.log(threshold[moving] / self.trust[moving]) / \
+                np.log(factors[moving])
+        crossing = crossing[crossing >= 0]
+        if len(crossing) == 0:
+            return np.iinfo(np.int64).max
+        # one round short of the crossing, so rounding of the multiply-add
+        # cannot flip a decision early
+        return max(0, int(np.floor(crossing.min())) - 1)
+
+    def forward(self, rounds):
+        """ plays "rounds" more rounds of the last one """
+        engine = self.engine
+        fixed1, fixed2 = self.p1[self.fixed], self.p2[self.fixed]
+        engine.trust.scale(self.rows, self.cols, self.factors() ** rounds)
+        engine.currency += rounds * np.bincount(
+            np.concatenate((fixed1, fixed2)),
+            weights=np.concatenate((self.p1Delta, self.p2Delta)),
+            minlength=len(engine.currency))
+        if len(self.random):
+            r1, r2 = self.p1[self.random], self.p2[self.random]
+            engine.runRounds(rounds, r1, r2)
+        self.reset()
+
+    def state(self):
+        """ what a checkpoint needs to continue detecting: a JSON dict and
+            a dict of arrays
+        """
+        state = {"steady": self.steady, "quiet": self.quiet}
+        if self.decisions is None:
+            return state, {}
+        return state, {"decisions": self.decisions, "trust": self.trust}
+
+    def restore(self, state, arrays):
+        self.steady = state["steady"]
+        self.quiet = state["quiet"]
+        if "decisions" in arrays:
+            self.decisions = np.array(arrays["decisions"])
+            self.trust = np.array(arrays["trust"])
@@ -0,0 +1,286 @@
+from collections import deque, namedtuple
+
+import numpy as np
+
+# neighbour modes, same values as igraph.OUT, igraph.IN and igraph.ALL
+OUT = 1
+IN = 2
+ALL = 3
+
+
+class CSRGraph(object):
+    """ Compact undirected graph over integer vertices 0..n-1.
+
+        The adjacency is stored in CSR form: the neighbours of vertex v are
+        indices[offsets[v]:offsets[v + 1]], sorted, as int32 arrays.
+        "players" optionally maps each vertex to the player object it stands
+        for, and "playerIds" holds their ids.
+    """
+
+    def __init__(self, offsets, indices, players=None):
+        self.offsets = np.asarray(offsets, dtype=np.int32)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.players = players
+        if players is not None:
+            self.playerIds = np.array([p.id for p in players], dtype=np.int32)
+        else:
+            self.playerIds = np.arange(self.vcount(), dtype=np.int32)
+
+    @classmethod
+    def fromEdges(cls, n, edges, players=None):
+        """ builds the graph from an (E, 2) array of vertex pairs; duplicate
+            edges and self loops are dropped
+        """
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        both = np.concatenate((edges, edges[:, ::-1]))
+        keys = np.unique(both[:, 0] * n + both[:, 1])
+        src = keys // n
+        offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+        return cls(offsets, keys % n, players)
+
+    @classmethod
+    def fromGraph(cls, graph):
+        """ converts a graph.Graph, vertices keep their graph.vertex_index """
+        players = graph.indexed_vertices()
+        return cls.fromEdges(len(players), graph.edge_array(), players)
+
+    def vcount(self):
+        return len(self.offsets) - 1
+
+    def ecount(self):
+        return len(self.indices) // 2
+
+    def is_directed(self):
+        return False
+
+    def degree(self, vertices=None):
+        degrees = np.diff(self.offsets)
+        if vertices is None:
+            return degrees.tolist()
+        if np.isscalar(vertices):
+            return int(degrees[vertices])
+        return degrees[np.asarray(vertices, dtype=np.intp)].tolist()
+
+    def neighbors(self, vertex, mode=ALL):
+        return self.indices[self.offsets[vertex]:
+                            self.offsets[vertex + 1]].tolist()
+
+    def are_connected(self, a, b):
+        row = self.indices[self.offsets[a]:self.offsets[a + 1]]
+        pos = np.searchsorted(row, b)
+        return pos < len(row) and row[pos] == b
+
+    def edgeArray(self):
+        """ returns every edge once, as an (E, 2) int32 array with u < v """
+        src = np.repeat(np.arange(self.vcount(), dtype=np.int32),
+                        np.diff(self.offsets))
+        keep = src < self.indices
+        return np.column_stack((src[keep], self.indices[keep]))
+
+    def player(self, vertex):
+        return self.players[vertex]
+
+    def toShuffleGraph(self):
+        return ShuffleGraph(self.vcount(), self.edgeArray(), self.players)
+
+
+_Edge = namedtuple("_Edge", ["source", "target"])
+
+
+class _EdgeSeq(object):
+    """ minimal stand-in for igraph's Graph.es """
+
+    def __init__(self, edges):
+        self._edges = edges
+
+    def __len__(self):
+        return len(self._edges)
+
+    def __getitem__(self, eidx):
+        return _Edge(*self._edges[eidx])
+
+
+class ShuffleGraph(object):
+    """ Mutable undirected graph implementing the igraph.Graph methods used
+        by clusterRandNetwork.bansal_shuffle.
+
+        Adjacency is kept as one set per vertex and the edge list supports
+        O(1) deletion by swapping the deleted edge with the last one, so
+        every rewiring step costs O(1) regardless of the graph size. Use
+        CSRGraph.toShuffleGraph to create one and toCSR to convert back.
+    """
+
+    def __init__(self, n, edges=(), players=None):
+        self.players = players
+        self._adj = [set() for i in range(n)]
+        self._edges = []
+        self._position = {}
+        self.es = _EdgeSeq(self._edges)
+        self.add_edges(np.asarray(edges).reshape(-1, 2).tolist())
+
+    def vcount(self):
+        return len(self._adj)
+
+    def ecount(self):
+        return len(self._edges)
+
+    def is_directed(self):
+        return False
+
+    def degree(self, vertices=None):
+        if vertices is None:
+            return [len(nbrs) for nbrs in self._adj]
+        if np.isscalar(vertices):
+            return len(self._adj[vertices])
+        return [len(self._adj[v]) for v in vertices]
+
+    def neighbors(self, vertex, mode=ALL):
+        return sorted(self._adj[vertex])
+
+    def are_connected(self, a, b):
+        return b in self._adj[a]
+
+    def add_edges(self, edges):
+        for (a, b) in edges:
+            a, b = int(a), int(b)
+            key = (a, b) if a < b else (b, a)
+            if a == b or key in self._position:
+                continue
+            self._position[key] = len(self._edges)
+            self._edges.append(key)
+            self._adj[a].add(b)
+            self._adj[b].add(a)
+
+    def delete_edges(self, edges):
+        for (a, b) in edges:
+            key = (a, b) if a < b else (b, a)
+            pos = self._position.pop(key)
+            last = self._edges.pop()
+            if pos < len(self._edges):
+                self._edges[pos] = last
+                self._position[last] = pos
+            self._adj[a].discard(b)
+            self._adj[b].discard(a)
+
+    def copy(self):
+        return ShuffleGraph(self.vcount(), self._edges, self.players)
+
+    def transitivity_undirected(self):
+        triangles = 0
+        for v, nbrs in enumerate(self._adj):
+            for u in nbrs:
+                if u > v:
+                    triangles += len(nbrs & self._adj[u])
+        degrees = np.array(self.degree(), dtype=np.int64)
+        triples = int((degrees * (degrees - 1) // 2).sum())
+        if triples == 0:
+            return 0.
+        # every triangle was counted once per edge
+        return float(triangles) / triples
+
+    def is_connected(self):
+        n = self.vcount()
+        if n == 0:
+            return True
+        seen = [False] * n
+        seen[0] = True
+        queue = deque([0])
+        reached = 1
+        while queue:
+            v = queue.popleft()
+            for u in self._adj[v]:
+                if not seen[u]:
+                    seen[u] = True
+                    reached += 1
+                    queue.append(u)
+        return reached == n
+
+    def edgeArray(self):
+        return np.array(self._edges, dtype=np.int32).reshape(-1, 2)
+
+    def toCSR(self):
+        return CSRGraph.fromEdges(self.vcount(), self.edgeArray(),
+                                  self.players)
+
+
+class SwapAdjacency(object):
+    """ Sorted adjacency of an undirected simple graph under double edge
+        swaps, for vectorized motif sampling.
+
+        A double edge swap never changes a vertex degree, so every vertex
+        keeps a fixed slice of one flat array holding the keys u * n + v of
+        its neighbours v. Each slice is sorted, which makes the whole array
+        sorted: adjacency tests for a batch of pairs are one searchsorted,
+        and a uniformly random neighbour or edge is one random slot.
+    """
+
+    def __init__(self, n, edges):
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self.n = n
+        both = np.concatenate((edges, edges[:, ::-1]))
+        self.keys = np.sort(both[:, 0] * n + both[:, 1])
+        self.degrees = np.bincount(both[:, 0], minlength=n)
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self.degrees, out=self.offsets[1:])
+        # source vertex of every slot, fixed
+        self.sources = np.repeat(np.arange(n, dtype=np.int64), self.degrees)
+
+    @classmethod
+    def fromGraph(cls, G):
+        """ from a ShuffleGraph, CSRGraph or undirected igraph.Graph """
+        if hasattr(G, "edgeArray"):
+            edges = G.edgeArray()
+        else:
+            edges = G.get_edgelist()
+        return cls(G.vcount(), edges)
+
+    def connected(self, a, b):
+        """ element-wise adjacency test of the vertex arrays a and b """
+        wanted = np.asarray(a, dtype=np.int64) * self.n + b
+        pos = np.searchsorted(self.keys, wanted)
+        np.minimum(pos, len(self.keys) - 1, out=pos)
+        return self.keys[pos] == wanted
+
+    def randomNeighbors(self, vertices, uniform):
+        """ a neighbour of every vertex, picked by the uniform [0, 1) draws;
+            vertices must not be isolated
+        """
+        slots = self.offsets[vertices] + (
+            uniform * self.degrees[vertices]).astype(np.int64)
+        return self.keys[slots] - vertices * self.n
+
+    def randomEdges(self, slots):
+        """ the (source, target) of the given slots in [0, 2E); uniform slots
+            give uniform edges in random orientation
+        """
+        sources = self.sources[slots]
+        return sources, self.keys[slots] - sources * self.n
+
+    def row(self, v):
+        return self.keys[self.offsets[v]:self.offsets[v + 1]] - v * self.n
+
+    def swap(self, removed, added):
+        """ replaces the edges in removed by those in added, which must keep
+            every degree, and returns the resulting change in the number of
+            triangles
+        """
+        rows = {}
+        for (a, b) in removed + added:
+            for v in (a, b):
+                if v not in rows:
+                    rows[v] = self.row(v)
+        delta = 0
+        for (a, b) in removed:
+            rows[a] = rows[a][rows[a] != b]
+            rows[b] = rows[b][rows[b] != a]
+            delta -= np.intersect1d(rows[a], rows[b], True).size
+        for (a, b) in added:
+            delta += np.intersect1d(rows[a], rows[b], True).size
+            rows[a] = np.append(rows[a], b)
+            rows[b] = np.append(rows[b], a)
+        for v, row in rows.items():
+            row.sort()
+            self.keys[self.offsets[v]:self.offsets[v + 1]] = row + v * self.n
+        return delta
@@ -0,0 +1,249 @@
+""" Structured, buffered match event log.
+
+    A sink records one row per match: (round, p1, p2, p1Decision, p2Decision,
+    p1Delta, p2Delta), where p1 and p2 are engine indices. Rows are collected
+    in preallocated columnar buffers and flushed in bulk, either as NumPy .npz
+    chunks in a directory or, when pyarrow is installed, as row groups of a
+    Parquet file. A human-readable text log is rendered afterwards with
+    renderText.
+
+    How much a simulation logs is set by its log level: LOG_OFF writes
+    nothing, LOG_SUMMARY the end-of-game results, LOG_ROUNDS adds one
+    aggregate line per round, LOG_MATCHES adds the per-match event log and
+    LOG_FULL adds a dump of every smart player's trust estimations after each
+    round.
+"""
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from matchEngine import typeNames
+
+# simulator log levels, each one includes everything below it
+LOG_OFF = 0
+LOG_SUMMARY = 1
+LOG_ROUNDS = 2
+LOG_MATCHES = 3
+LOG_FULL = 4
+
+levelNames = {"off": LOG_OFF, "summary": LOG_SUMMARY, "rounds": LOG_ROUNDS,
+              "matches": LOG_MATCHES, "full": LOG_FULL}
+
+COLUMNS = [
+    ("round", np.int32),
+    ("p1", np.int32),
+    ("p2", np.int32),
+    ("p1Decision", np.bool_),
+    ("p2Decision", np.bool_),
+    ("p1Delta", np.float64),
+    ("p2Delta", np.float64),
+]
+
+
+class EventSink(object):
+    """ Base sink, buffers rows and hands full buffers to _flush. On its own
+        it discards every event.
+    """
+
+    def __init__(self, chunkSize=1 << 20):
+        self.chunkSize = chunkSize
+        self.buffers = dict((name, np.empty(chunkSize, dtype=dtype))
+                            for name, dtype in COLUMNS)
+        self.size = 0
+        self.chunks = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def writePlayers(self, ids, typeCodes):
+        """ records the player id and type code of every engine index """
+        pass
+
+    def record(self, round, p1, p2, p1Decision, p2Decision, p1Delta,
+               p2Delta):
+        """ appends a batch of matches; every argument but "round" is an
+            array with one entry per match
+        """
+        columns = (np.atleast_1d(p1), np.atleast_1d(p2),
+                   np.atleast_1d(p1Decision), np.atleast_1d(p2Decision),
+                   np.atleast_1d(p1Delta), np.atleast_1d(p2Delta))
+        m = len(columns[0])
+        done = 0
+        while done < m:
+            take = min(m - done, self.chunkSize - self.size)
+            dst = slice(self.size, self.size + take)
+            src = slice(done, done + take)
+            self.buffers["round"][dst] = round
+            for (name, dtype), values in zip(COLUMNS[1:], columns):
+                self.buffers[name][dst] = values[src]
+            self.size += take
+            done += take
+            if self.size == self.chunkSize:
+                self.flush()
+
+    def resumeFrom(self, chunks):
+        """ continues a log of which the first "chunks" chunks were kept by a
+            checkpoint
+        """
+        self.size = 0
+        self.chunks = chunks
+
+    def flush(self):
+        if self.size:
+            self._flush(dict((name, self.buffers[name][:self.size])
+                             for name, dtype in COLUMNS))
+            self.chunks += 1
+            self.size = 0
+
+    def _flush(self, columns):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class NpzEventSink(EventSink):
+    """ writes every full buffer to <directory>/events-NNNNNN.npz """
+
+    def __init__(self, directory, chunkSize=1 << 20, compress=True):
+        EventSink.__init__(self, chunkSize)
+        self.directory = directory
+        self.compress = compress
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def writePlayers(self, ids, typeCodes):
+        np.savez(os.path.join(self.directory, "players.npz"),
+                 ids=np.asarray(ids, dtype=np.int64),
+                 typeCodes=np.asarray(typeCodes, dtype=np.int8))
+
+    def resumeFrom(self, chunks):
+        EventSink.resumeFrom(self, chunks)
+        for name in glob.glob(os.path.join(self.directory, "events-*.npz")):
+            if int(os.path.basename(name)[7:13]) >= chunks:
+                os.remove(name)
+
+    def _flush(self, columns):
+        path = os.path.join(self.directory,
+                            "events-{0:06d}.npz".format(self.chunks))
+        if self.compress:
+            np.savez_compressed(path, **columns)
+        else:
+            np.savez(path, **columns)
+
+
+class ParquetEventSink(EventSink):
+    """ writes every full buffer as a row group of one Parquet file """
+
+    def __init__(self, path, chunkSize=1 << 20):
+        if pyarrow is None:
+            raise ImportError("ParquetEventSink requires pyarrow")
+        EventSink.__init__(self, chunkSize)
+        self.path = path
+        self.writer = None
+
+    def writePlayers(self, ids, typeCodes):
+        table = pyarrow.table({"ids": np.asarray(ids, dtype=np.int64),
+                               "typeCodes": np.asarray(typeCodes,
+                                                       dtype=np.int8)})
+        pyarrow.parquet.write_table(table, _playersPath(self.path))
+
+    def resumeFrom(self, chunks):
+        raise ValueError("Parquet event logs cannot be resumed, use an .npz "
+                         "chunk directory")
+
+    def _flush(self, columns):
+        table = pyarrow.table(columns)
+        if self.writer is None:
+            self.writer = pyarrow.parquet.ParquetWriter(self.path,
+                                                        table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        EventSink.close(self)
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+def _playersPath(path):
+    return os.path.splitext(path)[0] + ".players.parquet"
+
+
+def openEventSink(path, format="auto", chunkSize=1 << 20, resumable=False):
+    """ opens a Parquet sink for "parquet" (or "auto" when pyarrow is
+        installed), an .npz chunk directory otherwise. With resumable=True
+        "auto" always picks the .npz chunk directory, which unlike Parquet
+        can be resumed from a checkpoint
+    """
+    if format == "parquet" or (format == "auto" and pyarrow is not None and
+                               not resumable):
+        if not path.endswith(".parquet"):
+            path += ".parquet"
+        return ParquetEventSink(path, chunkSize)
+    return NpzEventSink(path, chunkSize)
+
+
+def readEvents(path):
+    """ returns (events, players): the event columns concatenated over all
+        chunks, and the player table, as dicts of arrays
+    """
+    if os.path.isdir(path):
+        chunks = [np.load(name) for name in
+                  sorted(glob.glob(os.path.join(path, "events-*.npz")))]
+        events = dict((name, np.concatenate([c[name] for c in chunks])
+                       if chunks else np.empty(0, dtype=dtype))
+                      for name, dtype in COLUMNS)
+        players = dict(np.load(os.path.join(path, "players.npz")))
+        return events, players
+    if pyarrow is None:
+        raise ImportError("reading Parquet event logs requires pyarrow")
+    table = pyarrow.parquet.read_table(path)
+    events = dict((name, table.column(name).to_numpy())
+                  for name, dtype in COLUMNS)
+    table = pyarrow.parquet.read_table(_playersPath(path))
+    players = dict((name, table.column(name).to_numpy())
+                   for name in ("ids", "typeCodes"))
+    return events, players
+
+
+def renderText(path, out):
+    """ renders an event log as a human-readable text file """
+    events, players = readEvents(path)
+    ids = players["ids"]
+    names = [typeNames[code] for code in players["typeCodes"]]
+    with open(out, "w") as f:
+        for k in range(len(events["round"])):
+            p1, p2 = events["p1"][k], events["p2"][k]
+            f.write("Round {0} between: \n".format(events["round"][k]))
+            f.write("{0} player ID: {1}, Decision: {2}, Outcome: {3}\n".format(
+                names[p1], ids[p1], events["p1Decision"][k],
+                events["p1Delta"][k]))
+            f.write("{0} player ID: {1}, Decision: {2}, Outcome: {3}\n".format(
+                names[p2], ids[p2], events["p2Decision"][k],
+                events["p2Delta"][k]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="render a binary event log as text")
+    parser.add_argument("log", help=".npz chunk directory or .parquet file")
+    parser.add_argument("out", help="text file to write")
+    args = parser.parse_args(argv)
+    renderText(args.log, args.out)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
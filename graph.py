@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class Graph(object):
 
     def __init__(self, graph_dict=None):
@@ -8,14 +11,56 @@ class Graph(object):
         if graph_dict == None:
             graph_dict = {}
         self.__graph_dict = graph_dict
+        # canonical edge index, kept up to date by add_vertex/add_edge:
+        # every vertex gets a dense integer index and every undirected edge
+        # is stored once, keyed by the frozenset of its end points
+        self.__vertex_index = {}
+        self.__indexed_vertices = []
+        self.__edge_index = {}
+        self.__edges = []
+        self.__pairs = []
+        self.__edge_array = None
+        for vertex in graph_dict:
+            self.__index_vertex(vertex)
+        for vertex in graph_dict:
+            for neighbour in graph_dict[vertex]:
+                self.__index_edge(vertex, neighbour)
 
     def vertices(self):
         """ returns the vertices of a graph """
         return list(self.__graph_dict.keys())
 
     def edges(self):
-        """ returns the edges of a graph """
-        return self.__generate_edges()
+        """ returns the edges of a graph. The list is cached and shared
+            between calls, so it must not be modified by the caller
+        """
+        return self.__edges
+
+    def has_edge(self, edge):
+        """ O(1) test whether the two vertices of "edge" are connected """
+        return frozenset(edge) in self.__edge_index
+
+    def vertex_index(self, vertex):
+        """ returns the integer index of a vertex, as used by edge_array """
+        return self.__vertex_index[vertex]
+
+    def indexed_vertices(self):
+        """ returns every vertex, including edge end points that were never
+            added with add_vertex, ordered by their integer index
+        """
+        return list(self.__indexed_vertices)
+
+    def edge_array(self):
+        """ returns the edges as a read-only (E, 2) int32 array of vertex
+            indices. It is cached until the graph changes
+        """
+        if self.__edge_array is None:
+            array = np.array(
+                [(self.__vertex_index[v1], self.__vertex_index[v2])
+                 for (v1, v2) in self.__pairs], dtype=np.int32)
+            self.__edge_array = array.reshape(len(self.__pairs), 2)
+            self.__edge_array.flags.writeable = False
+        return self.__edge_array
 
     def add_vertex(self, vertex):
         """ If the vertex "vertex" is not in
@@ -25,6 +70,7 @@ class Graph(object):
         """
         if vertex not in self.__graph_dict:
             self.__graph_dict[vertex] = []
+            self.__index_vertex(vertex)
 
     def add_edge(self, edge):
         """ assumes that edge is of type set, tuple or list;
@@ -36,25 +82,32 @@ class Graph(object):
             self.__graph_dict[vertex1].append(vertex2)
         else:
             self.__graph_dict[vertex1] = [vertex2]
+        self.__index_edge(vertex1, vertex2)
+
+    def __index_vertex(self, vertex):
+        if vertex not in self.__vertex_index:
+            self.__vertex_index[vertex] = len(self.__indexed_vertices)
+            self.__indexed_vertices.append(vertex)
 
-    def __generate_edges(self):
-        """ A static method generating the edges of the
-            graph "graph". Edges are represented as sets
-            with one (a loop back to the vertex) or two
-            vertices
+    def __index_edge(self, vertex1, vertex2):
+        """ adds an edge to the edge index unless it is already there.
+            Edges are represented as sets with one (a loop back to the
+            vertex) or two vertices
         """
-        edges = []
-        for vertex in self.__graph_dict:
-            for neighbour in self.__graph_dict[vertex]:
-                if {neighbour, vertex} not in edges:
-                    edges.append({vertex, neighbour})
-        return edges
+        key = frozenset((vertex1, vertex2))
+        if key not in self.__edge_index:
+            self.__index_vertex(vertex1)
+            self.__index_vertex(vertex2)
+            self.__edge_index[key] = len(self.__edges)
+            self.__edges.append(set(key))
+            self.__pairs.append((vertex1, vertex2))
+            self.__edge_array = None
 
     def __str__(self):
         res = "vertices: "
         for k in self.__graph_dict:
             res += str(k) + " "
         res += "\nedges: "
-        for edge in self.__generate_edges():
+        for edge in self.__edges:
             res += str(edge) + " "
         return res
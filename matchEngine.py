@@ -0,0 +1,310 @@
+import random
+
+import numpy as np
+
+from trustStore import TrustStore, createTrustStore
+from strategies import getStrategy
+import SmartPlayer
+import RandomPlayer
+import AlwaysReciprocatePlayer
+import NonReciprocativePlayer
+
+# type codes, also the typeCode of each player class and the type codes of
+# the ids in player.registry
+SMART = SmartPlayer.smartPlayer.typeCode
+RANDOM = RandomPlayer.RandomPlayer.typeCode
+ALWAYS_RECIPROCATE = AlwaysReciprocatePlayer.AlwaysReciprocatePlayer.typeCode
+NON_RECIPROCATIVE = NonReciprocativePlayer.NonReciprocativePlayer.typeCode
+
+# indexed by type code
+typeNames = ["smart", "random", "alwaysReciprocate", "nonReciprocative"]
+
+# indexed by type code
+playerTypes = [SmartPlayer.smartPlayer, RandomPlayer.RandomPlayer,
+               AlwaysReciprocatePlayer.AlwaysReciprocatePlayer,
+               NonReciprocativePlayer.NonReciprocativePlayer]
+
+_typeModules = {
+    SmartPlayer.smartPlayer: (SMART, SmartPlayer),
+    RandomPlayer.RandomPlayer: (RANDOM, RandomPlayer),
+    AlwaysReciprocatePlayer.AlwaysReciprocatePlayer: (ALWAYS_RECIPROCATE,
+                                                      AlwaysReciprocatePlayer),
+    NonReciprocativePlayer.NonReciprocativePlayer: (NON_RECIPROCATIVE,
+                                                    NonReciprocativePlayer),
+}
+
+
+class MatchEngine(object):
+    """ Array backed version of Agent.runMatch.
+
+        Every player's currency, trustor flag, trusting coefficient and type
+        code live in NumPy arrays, indexed by the player's position in
+        "players". A whole round of matches is evaluated with batched array
+        operations and gives the same currency and trust outcomes as calling
+        runMatch on the player objects in the same order.
+
+        A round may hold each (p1, p2) pair at most once, and never both
+        (p1, p2) and (p2, p1), since the matches of a round are evaluated
+        simultaneously.
+
+        "players" is a list of player objects or a population.Population.
+
+        Random players draw from the global random module, in the same order
+        as runMatch, unless the engine is given a numpy Generator ("rng"), in
+        which case a round's random decisions are one vectorized draw.
+
+        Every player type decides with a strategy (see strategies), by
+        default the batched version of its class; "strategies" maps type
+        names to other strategy names or objects.
+    """
+
+    def __init__(self, players, warmupMatches=0, trustDtype=np.float64,
+                 rng=None, pairs=None, strategies=None):
+        self.warmupMatches = warmupMatches
+        self.rng = rng
+        self.index = {}
+        if hasattr(players, "typeCode"):
+            # a population.Population: its arrays are used as they are, so
+            # its views always show the engine state
+            self.population = self.players = players
+            n = len(players)
+            self.typeCode = players.typeCode
+            self.currency = players.currency
+            self.trustor = players.trustor
+            self.coefficient = players.coefficient
+        else:
+            self.population = None
+            self.players = list(players)
+            n = len(self.players)
+            self.typeCode = np.empty(n, dtype=np.int8)
+            self.currency = np.empty(n, dtype=np.float64)
+            self.trustor = np.empty(n, dtype=bool)
+            self.coefficient = np.full(n, np.nan, dtype=np.float64)
+            for i, player in enumerate(self.players):
+                self.index[player] = i
+                code = _typeModules[type(player)][0]
+                self.typeCode[i] = code
+                self.currency[i] = player.currency
+                self.trustor[i] = player.trustor
+                if code == SMART:
+                    self.coefficient[i] = player.trustingCoefficient
+        modules = [_typeModules[cls][1] for cls in playerTypes]
+        self.fee = np.array([module.global_bank_fee for module in modules],
+                            dtype=np.float64)[self.typeCode]
+        self.win = np.array([module.global_bank_win for module in modules],
+                            dtype=np.float64)[self.typeCode]
+        self.lose = np.array([module.global_bank_lose for module in modules],
+                             dtype=np.float64)[self.typeCode]
+        self.threshold = SmartPlayer.smartPlayer.threshold(self.fee)
+        names = dict(zip(typeNames, typeNames))
+        if strategies:
+            unknown = set(strategies) - set(typeNames)
+            if unknown:
+                raise ValueError("unknown player types: " +
+                                 ", ".join(sorted(unknown)))
+            names.update(strategies)
+        # indexed by type code
+        self.strategies = [getStrategy(names[name]) for name in typeNames]
+        self.codes = np.unique(self.typeCode)
+        for code in self.codes:
+            if self.strategies[code].needsCoefficient and np.isnan(
+                    self.coefficient[self.typeCode == code]).any():
+                raise ValueError(
+                    "strategy {0} needs a trusting coefficient, which {1} "
+                    "players do not have".format(self.strategies[code].name,
+                                                 typeNames[code]))
+        self.refusalFee = np.array([strategy.refusalFee for strategy in
+                                    self.strategies])[self.typeCode]
+        self.isSmart = self.typeCode == SMART
+        # players whose decisions are random draws
+        self.isRandom = ~np.array([strategy.deterministic for strategy in
+                                   self.strategies])[self.typeCode]
+        # player i's estimation of player j, indexed by engine position.
+        # float64 keeps the decisions identical to the object path. With the
+        # (p1, p2) pairs that will be played only those are stored, so sparse
+        # networks do not need an N x N matrix
+        if pairs is None:
+            self.trust = TrustStore(n, trustDtype)
+        else:
+            p1, p2 = pairs
+            self.trust = createTrustStore(n, np.concatenate((p1, p2)),
+                                          np.concatenate((p2, p1)),
+                                          trustDtype)
+        if self.population is not None:
+            self.population.trust = self.trust
+            return
+        byId = {}
+        for j, player in enumerate(self.players):
+            byId[player.id] = j
+        for i in np.flatnonzero(self.isSmart):
+            for pid, mem in self.players[i].estimations().items():
+                if pid in byId:
+                    try:
+                        self.trust.set(i, byId[pid], mem)
+                    except KeyError:
+                        # never matched against each other in this network
+                        pass
+
+    def indicesOf(self, players):
+        """ returns the engine indices of the given player objects """
+        return np.fromiter((self.index[p] for p in players), dtype=np.intp,
+                           count=len(players))
+
+    def randomBits(self, n):
+        """ draws n bits from the engine's generator, or from the global
+            random module exactly as n calls of random.getrandbits(1) would
+        """
+        if self.rng is not None:
+            return self.rng.integers(0, 2, size=n, dtype=np.uint8).view(bool)
+        if n == 0:
+            return np.zeros(0, dtype=bool)
+        words = np.frombuffer(
+            random.getrandbits(32 * n).to_bytes(4 * n, "little"),
+            dtype="<u4")
+        return (words >> 31).astype(bool)
+
+    def _byStrategy(self, me):
+        """ yields the strategy and the mask of "me" of every type in me """
+        codes = self.typeCode[me]
+        for code in self.codes:
+            mask = codes == code
+            if mask.any():
+                yield self.strategies[code], mask
+
+    def _decide(self, me, other):
+        """ decisions of players "me" against "other" and the fee paid by
+            trusters that refuse to trust
+        """
+        ans = np.zeros(len(me), dtype=bool)
+        for strategy, mask in self._byStrategy(me):
+            ans[mask] = strategy.decide_batch(me[mask], other[mask], self)
+        paid = np.where(self.refusalFee[me] & ~ans & self.trustor[me],
+                        -self.fee[me], 0.0)
+        return ans, paid
+
+    def _payoff(self, me, otherAns):
+        """ vectorized updateCurrency """
+        return np.where(otherAns, self.win[me],
+                        np.where(self.trustor[me], -self.fee[me],
+                                 self.lose[me]))
+
+    def playRound(self, p1, p2):
+        """ plays the matches p1[k] vs p2[k] in order, as runMatch would.
+            Returns the decisions and currency changes of both sides.
+        """
+        p1 = np.asarray(p1, dtype=np.intp)
+        p2 = np.asarray(p2, dtype=np.intp)
+        m = len(p1)
+
+        # both sides decide in match order, p1 before p2, which is the
+        # order random players draw in
+        ans, paid = self._decide(np.column_stack((p1, p2)).ravel(),
+                                 np.column_stack((p2, p1)).ravel())
+        p1Ans, p2Ans = ans[0::2], ans[1::2]
+        p1Paid, p2Paid = paid[0::2], paid[1::2]
+
+        # apply the currency changes in the same order as runMatch so the
+        # floating point results are identical
+        p1Pay = self._payoff(p1, p2Ans)
+        p2Pay = self._payoff(p2, p1Ans)
+        idx = np.column_stack((p1, p2, p1, p2)).ravel()
+        vals = np.column_stack((p1Paid, p2Paid, p1Pay, p2Pay)).ravel()
+        np.add.at(self.currency, idx, vals)
+
+        warmup = np.arange(m) < self.warmupMatches
+        self.warmupMatches = max(0, self.warmupMatches - m)
+        update = p1Ans & ~warmup
+        self._update(p1[update], p2[update], p2Ans[update])
+        self._update(p2[update], p1[update], p1Ans[update])
+
+        return p1Ans, p2Ans, p1Paid + p1Pay, p2Paid + p2Pay
+
+    def _update(self, me, other, result, rounds=1):
+        """ vectorized updateTrustStatus, "rounds" times """
+        for strategy, mask in self._byStrategy(me):
+            strategy.update_batch(me[mask], other[mask], result[mask], self,
+                                  rounds)
+
+    def _stable(self, me, other, ans, otherAns):
+        stable = np.zeros(len(me), dtype=bool)
+        for strategy, mask in self._byStrategy(me):
+            stable[mask] = strategy.stable_batch(me[mask], other[mask],
+                                                 ans[mask], otherAns[mask],
+                                                 self)
+        return stable
+
+    def fixedMatches(self, p1, p2):
+        """ mask of the matches whose decisions can no longer change: no
+            random player takes part, and p1 does not trust (so nothing is
+            updated) or both strategies keep their decisions when the match
+            repeats (see strategies). Bots against bots, and smart players
+            whose trust has dropped below the threshold, play fixed matches.
+        """
+        p1 = np.asarray(p1, dtype=np.intp)
+        p2 = np.asarray(p2, dtype=np.intp)
+        fixed = ~(self.isRandom[p1] | self.isRandom[p2])
+        p1, p2 = p1[fixed], p2[fixed]
+        p1Ans = self._decide(p1, p2)[0]
+        p2Ans = self._decide(p2, p1)[0]
+        fixed[fixed] = ~p1Ans | (self._stable(p1, p2, p1Ans, p2Ans) &
+                                 self._stable(p2, p1, p2Ans, p1Ans))
+        return fixed
+
+    def _playFixed(self, rounds, p1, p2):
+        """ plays "rounds" rounds of fixed matches with one multiply-add """
+        p1Ans, p1Paid = self._decide(p1, p2)
+        p2Ans, p2Paid = self._decide(p2, p1)
+        delta = np.concatenate((p1Paid + self._payoff(p1, p2Ans),
+                                p2Paid + self._payoff(p2, p1Ans)))
+        self.currency += rounds * np.bincount(
+            np.concatenate((p1, p2)), weights=delta,
+            minlength=len(self.currency))
+        self._update(p1[p1Ans], p2[p1Ans], p2Ans[p1Ans], rounds)
+        self._update(p2[p1Ans], p1[p1Ans], p1Ans[p1Ans], rounds)
+
+    def runRounds(self, rounds, p1, p2, closedForm=False, recheck=16):
+        """ plays the same set of matches for the given number of rounds and
+            returns how many matches were played one by one.
+
+            With closedForm=True, once the warmup is over, fixed matches (see
+            fixedMatches) are accounted for all remaining rounds at once, and
+            only the others are played round by round; every "recheck" rounds
+            they are checked for matches that became fixed. Random players
+            draw the same random decisions as in playRound, the currency and
+            trust values only differ by rounding.
+        """
+        p1 = np.asarray(p1, dtype=np.intp)
+        p2 = np.asarray(p2, dtype=np.intp)
+        if not closedForm:
+            for i in range(rounds):
+                self.playRound(p1, p2)
+            return rounds * len(p1)
+        played = 0
+        while rounds > 0 and self.warmupMatches > 0:
+            self.playRound(p1, p2)
+            played += len(p1)
+            rounds -= 1
+        while rounds > 0:
+            fixed = self.fixedMatches(p1, p2)
+            if fixed.any():
+                self._playFixed(rounds, p1[fixed], p2[fixed])
+                p1, p2 = p1[~fixed], p2[~fixed]
+            if len(p1) == 0:
+                break
+            for i in range(min(recheck, rounds)):
+                self.playRound(p1, p2)
+            played += min(recheck, rounds) * len(p1)
+            rounds -= min(recheck, rounds)
+        return played
+
+    def sync(self):
+        """ writes the engine state back into the player objects; a
+            population shares it already
+        """
+        if self.population is not None:
+            return
+        for i, player in enumerate(self.players):
+            player.currency = float(self.currency[i])
+            if self.isSmart[i]:
+                for j, mem in self.trust.row(i).items():
+                    player.setEstimation(self.players[j].id, mem)
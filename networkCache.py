@@ -0,0 +1,104 @@
+""" On-disk cache of generated networks.
+
+    Shuffling a network towards a clustering coefficient is by far the most
+    expensive part of setting up a game, and sweeps build the same networks
+    over and over. The cache stores every network as an (E, 2) int32 edge
+    array in a .npy file named after a hash of the parameters it was built
+    from and of GENERATOR_VERSION, so changing any parameter, or the
+    generator code, simply misses. Hits are read in one go: the engine
+    needs the match arrays in memory as intp anyway.
+
+    Files are written to a temporary name and renamed into place. The cache
+    is kept under a size limit by removing the least recently used files,
+    every hit refreshes a file's modification time.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# bump whenever a change to networks, clusterRandNetwork or
+# Agent.networkEdges changes the network generated for the same parameters
+GENERATOR_VERSION = 1
+
+
+def networkKey(params):
+    """ content address of the network described by the params dict """
+    blob = json.dumps({"params": params, "version": GENERATOR_VERSION},
+                      sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class NetworkCache(object):
+
+    def __init__(self, directory, maxBytes=1 << 30):
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, params):
+        """ returns the edge array for params, or None """
+        path = self._path(networkKey(params))
+        try:
+            edges = np.load(path)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path, None)
+        self.hits += 1
+        return edges
+
+    def put(self, params, edges):
+        """ stores the edge array for params and evicts old entries """
+        key = networkKey(params)
+        path = self._path(key)
+        tmp = path + ".tmp.npy"
+        np.save(tmp, np.asarray(edges, dtype=np.int32).reshape(-1, 2))
+        os.replace(tmp, path)
+        with open(os.path.join(self.directory, key + ".json"), "w") as f:
+            json.dump({"params": params, "version": GENERATOR_VERSION}, f,
+                      sort_keys=True)
+        self.evict(keep=path)
+
+    def entries(self):
+        """ (mtime, size, path) of every cached network, oldest first """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy") and not name.endswith(".tmp.npy"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size,
+                                os.path.join(self.directory, name)))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for mtime, size, path in self.entries())
+
+    def evict(self, keep=None):
+        """ removes least recently used networks until the cache fits in
+            maxBytes; "keep" is never removed
+        """
+        entries = self.entries()
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if total <= self.maxBytes:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    def clear(self):
+        for mtime, size, path in self.entries():
+            self._remove(path)
+
+    def _remove(self, path):
+        os.remove(path)
+        sidecar = path[:-len(".npy")] + ".json"
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
@@ -0,0 +1,151 @@
+""" Sparse random network generators.
+
+    Every generator returns the edges of an undirected simple graph as an
+    (E, 2) int32 array of vertex pairs, built with vectorized numpy draws in
+    roughly linear time in the number of edges, so they scale to millions of
+    players. The arrays can be used as the p1, p2 columns of the match loop
+    or turned into a graph for clusterRandNetwork.bansal_shuffle with
+    csrGraph.CSRGraph.fromEdges(n, edges).toShuffleGraph().
+
+    "rng" is anything numpy.random.default_rng accepts: None, an int seed, a
+    SeedSequence or a Generator.
+"""
+import numpy as np
+
+
+def simpleEdges(n, edges):
+    """ drops self loops and duplicate edges, the pairs of the result are
+        ordered u < v and sorted
+    """
+    edges = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+    u = edges.min(axis=1)
+    v = edges.max(axis=1)
+    keys = u[u != v] * n + v[u != v]
+    # sort and compare neighbours, faster than np.unique on large arrays
+    keys.sort()
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    keys = keys[first]
+    return np.column_stack((keys // n, keys % n)).astype(np.int32)
+
+
+def erdosRenyi(n, p, rng=None):
+    """ G(n, p): every pair of vertices is connected with probability p. The
+        number of edges is drawn first, then that many distinct pairs
+    """
+    rng = np.random.default_rng(rng)
+    pairs = n * (n - 1) // 2
+    m = rng.binomial(pairs, p) if pairs else 0
+    edges = np.zeros((0, 2), dtype=np.int32)
+    while len(edges) < m:
+        # draw a few more than missing, duplicates and loops are thrown away
+        k = int((m - len(edges)) * 1.1) + 16
+        drawn = rng.integers(0, n, size=(k, 2))
+        merged = simpleEdges(n, np.concatenate((edges, drawn)))
+        if len(merged) > m:
+            keep = np.sort(rng.choice(len(merged), m, replace=False))
+            merged = merged[keep]
+        edges = merged
+    return edges
+
+
+def configurationModel(degrees, rng=None):
+    """ random graph with the given degree sequence: vertex stubs are
+        shuffled and paired. Self loops and multi-edges are erased, so
+        degrees may come out slightly lower than asked for
+    """
+    rng = np.random.default_rng(rng)
+    degrees = np.asarray(degrees, dtype=np.int64)
+    stubs = np.repeat(np.arange(len(degrees)), degrees)
+    if len(stubs) % 2:
+        raise ValueError("the sum of the degrees must be even")
+    rng.shuffle(stubs)
+    return simpleEdges(len(degrees), stubs.reshape(-1, 2))
+
+
+def wattsStrogatz(n, k, p, rng=None):
+    """ ring lattice where every vertex is connected to its k nearest
+        neighbours (k even), each edge's far end is then rewired to a
+        uniformly random vertex with probability p
+    """
+    if k % 2:
+        raise ValueError("k must be even")
+    rng = np.random.default_rng(rng)
+    u = np.repeat(np.arange(n), k // 2)
+    v = (u + np.tile(np.arange(1, k // 2 + 1), n)) % n
+    rewire = rng.random(len(u)) < p
+    v[rewire] = rng.integers(0, n, size=int(rewire.sum()))
+    return simpleEdges(n, np.column_stack((u, v)))
+
+
+def barabasiAlbert(n, m, rng=None):
+    """ preferential attachment: every new vertex is connected to m existing
+        ones, picked with probability proportional to their degree.
+
+        This is the Batagelj-Brandes algorithm: the edge list is an array in
+        which every vertex appears once per incident edge, and each new edge
+        copies the endpoint at a uniformly random earlier position. The
+        random positions are drawn at once and the copies are resolved by
+        pointer jumping, which takes a logarithmic number of passes
+    """
+    rng = np.random.default_rng(rng)
+    ends = np.repeat(np.arange(n), m)
+    # target[e] is a random position among the slots before edge e's second
+    target = (rng.random(n * m) * (2 * np.arange(n * m) + 1)).astype(np.int64)
+    position = target.copy()
+    pending = position % 2 == 1
+    while pending.any():
+        position[pending] = target[position[pending] // 2]
+        pending = position % 2 == 1
+    return simpleEdges(n, np.column_stack((ends, ends[position // 2])))
+
+
+def randomBipartite(left, right, degree, rng=None):
+    """ random bipartite graph between vertices 0..left-1 and
+        left..left+right-1 in which every left vertex has the given degree
+        (at most right) and the right vertices share the edges as evenly as
+        possible. Pairs are ordered (left, right)
+    """
+    rng = np.random.default_rng(rng)
+    degree = min(degree, right)
+    if degree <= 0:
+        return np.zeros((0, 2), dtype=np.int32)
+    m = left * degree
+    u = np.repeat(np.arange(left), degree)
+    v = left + rng.permutation(np.arange(m) % right)
+    edges = simpleEdges(left + right, np.column_stack((u, v)))
+    # a left vertex that drew a right vertex twice gets new ones
+    while len(edges) < m:
+        have = np.bincount(edges[:, 0], minlength=left)
+        short = np.repeat(np.arange(left), degree - have)
+        extra = left + rng.integers(0, right, size=len(short))
+        edges = simpleEdges(left + right, np.concatenate(
+            (edges, np.column_stack((short, extra)))))
+    return edges
+
+
+TOPOLOGIES = ["bipartite", "erdosRenyi", "regular", "wattsStrogatz",
+              "barabasiAlbert"]
+
+
+def generate(topology, left, right, meanDegree, rng=None, rewire=0.1):
+    """ edges of a named topology over left + right vertices, with about
+        meanDegree edges per vertex (per left vertex for "bipartite").
+        "regular" is the configuration model with a constant degree
+    """
+    n = left + right
+    if topology == "bipartite":
+        return randomBipartite(left, right, int(meanDegree), rng)
+    if topology == "erdosRenyi":
+        return erdosRenyi(n, meanDegree / float(max(n - 1, 1)), rng)
+    if topology == "regular":
+        degree = int(meanDegree)
+        degrees = np.full(n, degree)
+        if n * degree % 2:
+            degrees[-1] -= 1
+        return configurationModel(degrees, rng)
+    if topology == "wattsStrogatz":
+        return wattsStrogatz(n, 2 * (int(meanDegree) // 2), rewire, rng)
+    if topology == "barabasiAlbert":
+        return barabasiAlbert(n, max(int(meanDegree) // 2, 1), rng)
+    raise ValueError("unknown topology: {0}".format(topology))
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class PlayerRegistry(object):
+    """ Hands out player ids from one dense space shared by every player
+        type, so ids never collide and can index flat arrays directly.
+
+        The registry keeps two tables: the type code of every id, and an
+        offset table of blocks, runs of consecutive ids of one type, given
+        by their first id, length and type code. Population reserves a
+        whole block per type at once.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._typeCodes = np.empty(1024, dtype=np.int8)
+        self.blockStarts = []
+        self.blockCounts = []
+        self.blockTypes = []
+
+    def reserve(self, typeCode, k=1):
+        """ reserves k consecutive ids of one type and returns the first """
+        first = self.size
+        if k == 0:
+            return first
+        if first + k > len(self._typeCodes):
+            grown = np.empty(max(2 * len(self._typeCodes), first + k),
+                             dtype=np.int8)
+            grown[:first] = self._typeCodes[:first]
+            self._typeCodes = grown
+        self._typeCodes[first:first + k] = typeCode
+        if self.blockTypes and self.blockTypes[-1] == typeCode:
+            self.blockCounts[-1] += k
+        else:
+            self.blockStarts.append(first)
+            self.blockCounts.append(k)
+            self.blockTypes.append(typeCode)
+        self.size = first + k
+        return first
+
+    @property
+    def typeCodes(self):
+        """ type code of every id handed out so far, -1 for skipped ids """
+        return self._typeCodes[:self.size]
+
+    def typeOf(self, ids):
+        return self._typeCodes[:self.size][ids]
+
+    def blocks(self):
+        """ the offset table as (first id, length, type code) arrays """
+        return (np.array(self.blockStarts, dtype=np.int64),
+                np.array(self.blockCounts, dtype=np.int64),
+                np.array(self.blockTypes, dtype=np.int8))
+
+    def seek(self, size):
+        """ makes "size" the next id handed out: later ids are forgotten,
+            or the gap is filled with ids of unknown type (-1)
+        """
+        if size > self.size:
+            self.reserve(-1, size - self.size)
+            return
+        while self.blockStarts and self.blockStarts[-1] >= size:
+            self.blockStarts.pop()
+            self.blockCounts.pop()
+            self.blockTypes.pop()
+        if self.blockStarts:
+            self.blockCounts[-1] = min(self.blockCounts[-1],
+                                       size - self.blockStarts[-1])
+        self.size = size
+
+    def reset(self):
+        self.seek(0)
+
+
+# the id space of all players in this process
+registry = PlayerRegistry()
+
+
+class Player(object):
+    """ Shared base of the player types.
+
+        Players only hold their id, role and currency (subclasses add their
+        own fields in __slots__), so they carry no per-instance dict. Ids
+        come from the shared registry. The bank fee, win and lose amounts
+        are read at call time from the module of the concrete player type
+        ("bank"), since every type keeps its own global_bank_* values.
+    """
+    __slots__ = ("id", "trustor", "currency")
+    typeCode = -1
+    bank = None
+
+    def __init__(self, trustor_or_trustee):
+        self.id = registry.reserve(self.typeCode)
+        self.trustor = trustor_or_trustee
+        self.currency = 0
+
+    def changeTrustStatus(self):
+        self.trustor = not self.trustor
+
+    def updateTrustStatus(self, other, result):
+        # bots keep no estimations of other players
+        pass
+
+    def updateCurrency(self, win_lose):
+        bank = self.bank
+        if win_lose:
+            self.currency += bank.global_bank_win
+        elif self.trustor:
+            self.currency -= bank.global_bank_fee
+        else:
+            self.currency += bank.global_bank_lose
@@ -0,0 +1,134 @@
+""" Struct-of-arrays player population.
+
+    A Population keeps the fields of all its players in typed arrays (id,
+    type code, trustor flag, trusting coefficient and currency), 26 bytes
+    per player, instead of one Python object each. Indexing it gives a
+    PlayerView, a two-slot object that reads and writes those arrays and
+    prints like the player class of its type. A MatchEngine built from a
+    population works on the population's arrays directly.
+"""
+import numpy as np
+
+from matchEngine import SMART, RANDOM, ALWAYS_RECIPROCATE, \
+    NON_RECIPROCATIVE, playerTypes
+from player import registry as sharedRegistry
+
+
+class PlayerView(object):
+    """ one player of a population """
+    __slots__ = ("population", "index")
+
+    def __init__(self, population, index):
+        self.population = population
+        self.index = index
+
+    @property
+    def id(self):
+        return int(self.population.ids[self.index])
+
+    @property
+    def typeCode(self):
+        return int(self.population.typeCode[self.index])
+
+    @property
+    def trustor(self):
+        return bool(self.population.trustor[self.index])
+
+    @trustor.setter
+    def trustor(self, value):
+        self.population.trustor[self.index] = value
+
+    @property
+    def currency(self):
+        return float(self.population.currency[self.index])
+
+    @currency.setter
+    def currency(self, value):
+        self.population.currency[self.index] = value
+
+    @property
+    def trustingCoefficient(self):
+        return float(self.population.coefficient[self.index])
+
+    def estimations(self):
+        """ the player's estimations as {player id: trust} """
+        return self.population.estimations(self.index)
+
+    def memoryPrint(self):
+        return playerTypes[SMART].memoryPrint(self)
+
+    def __str__(self):
+        return playerTypes[self.typeCode].__str__(self)
+
+    def __repr__(self):
+        return str(self)
+
+
+class Population(object):
+
+    def __init__(self, ids, typeCode, trustor, coefficient, currency=None):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.typeCode = np.asarray(typeCode, dtype=np.int8)
+        self.trustor = np.asarray(trustor, dtype=bool)
+        self.coefficient = np.asarray(coefficient, dtype=np.float64)
+        if currency is None:
+            currency = np.zeros(len(self.ids), dtype=np.float64)
+        self.currency = np.asarray(currency, dtype=np.float64)
+        # set by a MatchEngine, answers PlayerView.estimations
+        self.trust = None
+
+    @classmethod
+    def fromCounts(cls, smarts, trusters, coeff, randoms=0, recs=0,
+                   nonRecs=0, registry=None):
+        """ the players Agent.smartCreator, randCreator, alwaysRec and
+            nonRec would create, in the order trusters + trustees of
+            Agent.regNetwork: smart trusters first, then the other smart
+            players, randoms, always reciprocative and non-reciprocative
+            players. The ids are one consecutive range of "registry"
+            (player.registry by default), a block per type. Every player
+            gets the trusting coefficient, so any type can play a strategy
+            that keeps estimations
+        """
+        if registry is None:
+            registry = sharedRegistry
+        counts = [smarts, randoms, recs, nonRecs]
+        codes = [SMART, RANDOM, ALWAYS_RECIPROCATE, NON_RECIPROCATIVE]
+        typeCode = np.repeat(np.array(codes, dtype=np.int8), counts)
+        ids = np.concatenate([
+            np.arange(registry.reserve(code, k), registry.size,
+                      dtype=np.int64)
+            for code, k in zip(codes, counts)])
+        trustor = np.zeros(len(typeCode), dtype=bool)
+        trustor[:min(trusters, smarts)] = True
+        coefficient = np.full(len(typeCode), coeff, dtype=np.float64)
+        return cls(ids, typeCode, trustor, coefficient)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("population index out of range")
+        return PlayerView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield PlayerView(self, index)
+
+    def ofType(self, code):
+        """ views of every player with the given type code """
+        return [PlayerView(self, index)
+                for index in np.flatnonzero(self.typeCode == code)]
+
+    def estimations(self, index):
+        if self.trust is None:
+            return {}
+        return dict((int(self.ids[j]), value)
+                    for j, value in self.trust.row(index).items())
+
+    @property
+    def nbytes(self):
+        return (self.ids.nbytes + self.typeCode.nbytes + self.trustor.nbytes +
+                self.coefficient.nbytes + self.currency.nbytes)
@@ -0,0 +1,101 @@
+""" Per-phase timing and resource instrumentation for simulations.
+
+    A Profiler accumulates wall-clock time per named phase (player creation,
+    network construction, the match loop, logging), counts matches and rounds,
+    and tracks peak memory. cProfile and tracemalloc can be switched on for a
+    run; report() returns everything as a JSON-serialisable dict.
+"""
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+class Profiler(object):
+
+    def __init__(self, profile=False, traceMemory=False):
+        self.phases = {}
+        self.counters = {}
+        self.profile = cProfile.Profile() if profile else None
+        self.traceMemory = traceMemory
+        self.started = None
+        self.elapsed = 0.
+
+    def start(self):
+        if self.traceMemory:
+            tracemalloc.start()
+        if self.profile is not None:
+            self.profile.enable()
+        self.started = time.perf_counter()
+
+    def stop(self):
+        self.elapsed += time.perf_counter() - self.started
+        if self.profile is not None:
+            self.profile.disable()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @contextmanager
+    def phase(self, name):
+        """ times the enclosed block and adds it to phase "name" """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.) + seconds
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def peakMemory(self):
+        """ peak traced bytes when tracing memory, else the peak resident set
+            size of the process, or None when neither is available
+        """
+        if self.traceMemory and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[1]
+        if resource is None:
+            return None
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    def report(self):
+        report = {
+            "seconds": self.elapsed,
+            "phases": dict(self.phases),
+            "counters": dict(self.counters),
+            "peakMemory": self.peakMemory(),
+            "peakMemorySource": "tracemalloc" if self.traceMemory
+            else "maxrss",
+        }
+        matchTime = self.phases.get("matches", 0.)
+        if matchTime > 0:
+            report["matchesPerSecond"] = (self.counters.get("matches", 0) /
+                                          matchTime)
+            report["roundsPerSecond"] = (self.counters.get("rounds", 0) /
+                                         matchTime)
+        return report
+
+    def writeReport(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def dumpProfile(self, path):
+        """ writes the cProfile statistics, readable with pstats """
+        if self.profile is not None:
+            self.profile.dump_stats(path)
@@ -0,0 +1,175 @@
+""" Streaming per-round aggregate statistics.
+
+    RoundStatsCollector computes, after every round, the mean and variance of
+    currency per player type, the trust rate (share of matches in which p1
+    trusted), the reciprocation rate (share of trusting matches that p2
+    reciprocated) and a fixed-bin histogram of the trust values smart players
+    used in the round. Each round becomes one row of float64 values appended
+    to a raw binary time-series file, described by a JSON sidecar holding the
+    column names and, once the run ends, Welford running mean and variance of
+    every column over the rounds in which it was defined (null if it never
+    was). loadStats maps the file back as a structured array.
+"""
+import json
+import os
+
+import numpy as np
+
+from matchEngine import typeNames, SMART
+
+
+class RunningStats(object):
+    """ Welford's online mean and variance, O(1) memory per stream. Works on
+        scalars or element-wise on equally shaped arrays, with a count per
+        element; NaN values are skipped
+    """
+
+    def __init__(self, n=0, mean=0., m2=0.):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, value):
+        valid = ~np.isnan(value)
+        self.n = self.n + valid
+        delta = np.where(valid, value - self.mean, 0.)
+        self.mean = self.mean + delta / np.maximum(self.n, 1)
+        self.m2 = self.m2 + np.where(valid, delta * (value - self.mean), 0.)
+
+    @property
+    def average(self):
+        """ the mean, NaN where no value was added """
+        return np.where(self.n > 0, self.mean, np.nan)
+
+    @property
+    def variance(self):
+        return np.where(self.n > 0, self.m2 / np.maximum(self.n, 1), np.nan)
+
+    def state(self):
+        return {"n": np.asarray(self.n).tolist(),
+                "mean": np.asarray(self.mean).tolist(),
+                "m2": np.asarray(self.m2).tolist()}
+
+    @classmethod
+    def fromState(cls, state):
+        return cls(np.asarray(state["n"]), np.asarray(state["mean"]),
+                   np.asarray(state["m2"]))
+
+
+class FixedHistogram(object):
+    """ histogram over fixed, equally wide bins; values outside [lo, hi] are
+        counted in the first or last bin
+    """
+
+    def __init__(self, lo=0., hi=1., bins=10):
+        self.lo = lo
+        self.hi = hi
+        self.bins = bins
+
+    def counts(self, values):
+        scale = self.bins / (self.hi - self.lo)
+        idx = (np.asarray(values) - self.lo) * scale
+        idx = np.clip(idx.astype(np.intp), 0, self.bins - 1)
+        return np.bincount(idx, minlength=self.bins)
+
+
+def columnNames(bins):
+    names = ["round"]
+    for name in typeNames:
+        names += [name + "Mean", name + "Var"]
+    names += ["trustRate", "reciprocationRate"]
+    names += ["trustHist{0}".format(k) for k in range(bins)]
+    return names
+
+
+class RoundStatsCollector(object):
+
+    def __init__(self, path, engine, bins=10, lo=0., hi=1., resumeState=None):
+        self.path = path
+        self.engine = engine
+        self.histogram = FixedHistogram(lo, hi, bins)
+        self.columns = columnNames(bins)
+        self.masks = [engine.typeCode == code for code in
+                      range(len(typeNames))]
+        self.row = np.empty(len(self.columns), dtype=np.float64)
+        if resumeState is None:
+            self.rows = 0
+            self.overall = RunningStats()
+            self.f = open(path, "wb")
+        else:
+            self.rows = resumeState["rows"]
+            self.overall = RunningStats.fromState(resumeState["overall"])
+            self.f = open(path, "r+b")
+            self.f.truncate(self.rows * self.row.nbytes)
+            self.f.seek(self.rows * self.row.nbytes)
+
+    def update(self, round, p1, p2, p1Ans, p2Ans):
+        engine = self.engine
+        row = self.row
+        row[0] = round
+        k = 1
+        for mask in self.masks:
+            if mask.any():
+                values = engine.currency[mask]
+                row[k] = values.mean()
+                row[k + 1] = values.var()
+            else:
+                row[k] = row[k + 1] = np.nan
+            k += 2
+        trusted = int(p1Ans.sum())
+        row[k] = trusted / float(len(p1Ans)) if len(p1Ans) else np.nan
+        row[k + 1] = (int((p1Ans & p2Ans).sum()) / float(trusted)
+                      if trusted else np.nan)
+        k += 2
+        smart1 = engine.typeCode[p1] == SMART
+        smart2 = engine.typeCode[p2] == SMART
+        rows = np.concatenate((p1[smart1], p2[smart2]))
+        cols = np.concatenate((p2[smart1], p1[smart2]))
+        trust = engine.trust.lookup(rows, cols, engine.coefficient[rows])
+        row[k:] = self.histogram.counts(trust)
+        self.f.write(row.tobytes())
+        self.rows += 1
+        self.overall.add(row.copy())
+
+    def state(self):
+        """ what a checkpoint needs to continue the series """
+        self.f.flush()
+        return {"rows": self.rows, "overall": self.overall.state()}
+
+    def close(self):
+        self.f.close()
+        header = {
+            "columns": self.columns,
+            "dtype": "float64",
+            "rows": self.rows,
+            "histogram": {"lo": self.histogram.lo, "hi": self.histogram.hi,
+                          "bins": self.histogram.bins},
+            "mean": dict(zip(self.columns,
+                             _json(self.overall.average)
+                             if self.rows else [])),
+            "variance": dict(zip(self.columns,
+                                 _json(self.overall.variance)
+                                 if self.rows else [])),
+        }
+        with open(self.path + ".json", "w") as f:
+            json.dump(header, f, indent=2)
+
+
+def _json(values):
+    """ a list of the values with None for NaN, which JSON has no literal
+        for
+    """
+    return [None if np.isnan(value) else value
+            for value in np.asarray(values).tolist()]
+
+
+def loadStats(path):
+    """ memory-maps a statistics file as a structured array, one record per
+        round
+    """
+    with open(path + ".json") as f:
+        header = json.load(f)
+    dtype = np.dtype([(name, np.float64) for name in header["columns"]])
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
@@ -0,0 +1,94 @@
+""" Round schedulers: which matches of the network are played when.
+
+    A scheduler turns the (p1, p2) edge arrays of a network into the batches
+    of matches played in each logical round. MatchEngine.playRound evaluates
+    a batch simultaneously, which gives the same result as playing it match
+    by match as long as no pair occurs twice in it, so batches are split by
+    occurrence: the first occurrence of every pair goes into the first
+    batch, the second occurrences into the next, and so on.
+
+    SyncScheduler is the lock-step mode, every edge plays once per round.
+    PoissonScheduler gives every edge an independent Poisson clock: a round
+    (one unit of time) holds a Poisson number of events with mean
+    rate * E, each at a uniformly random edge, so a round costs time in
+    proportion to its events rather than to E.
+
+    Both support partial participation: every round each player takes
+    part with the given probability, and only matches between two
+    participating players are played.
+"""
+import numpy as np
+
+SCHEDULES = ["sync", "poisson"]
+
+
+def occurrenceBatches(edges):
+    """ splits an array of edge indices into batches in which every index
+        occurs at most once; the k-th batch holds the (k+1)-th occurrences
+        in their original order
+    """
+    if len(edges) == 0:
+        return []
+    order = np.argsort(edges, kind="stable")
+    ordered = edges[order]
+    starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+    runs = np.diff(np.r_[starts, len(edges)])
+    occurrence = np.empty(len(edges), dtype=np.int64)
+    occurrence[order] = np.arange(len(edges)) - np.repeat(starts, runs)
+    if runs.max() == 1:
+        return [edges]
+    return [edges[occurrence == k] for k in range(runs.max())]
+
+
+class SyncScheduler(object):
+
+    def __init__(self, p1, p2, n, participation=1., rng=None):
+        self.p1 = p1
+        self.p2 = p2
+        self.n = n
+        self.participation = participation
+        self.rng = rng
+
+    def _participants(self):
+        """ draws the mask of the players taking part in a round, or None
+            if everyone does
+        """
+        if self.participation >= 1:
+            return None
+        return self.rng.random(self.n) < self.participation
+
+    def _active(self, p1, p2, active):
+        """ keeps the matches between participating players """
+        if active is None:
+            return p1, p2
+        keep = active[p1] & active[p2]
+        return p1[keep], p2[keep]
+
+    def round(self):
+        """ returns the (p1, p2) batches of the next round, at least one """
+        return [self._active(self.p1, self.p2, self._participants())]
+
+
+class PoissonScheduler(SyncScheduler):
+
+    def __init__(self, p1, p2, n, rate=1., participation=1., rng=None):
+        SyncScheduler.__init__(self, p1, p2, n, participation, rng)
+        self.rate = rate
+
+    def round(self):
+        events = self.rng.poisson(self.rate * len(self.p1))
+        edges = self.rng.integers(0, len(self.p1), size=events)
+        # the same players take part in every batch of the round
+        active = self._participants()
+        batches = [self._active(self.p1[batch], self.p2[batch], active)
+                   for batch in occurrenceBatches(edges)]
+        return batches or [(self.p1[:0], self.p2[:0])]
+
+
+def createScheduler(schedule, p1, p2, n, rate=1., participation=1.,
+                    rng=None):
+    if schedule == "sync":
+        return SyncScheduler(p1, p2, n, participation, rng)
+    if schedule == "poisson":
+        return PoissonScheduler(p1, p2, n, rate, participation, rng)
+    raise ValueError("unknown schedule: {0}".format(schedule))
@@ -0,0 +1,40 @@
+""" Seed hierarchy for reproducible, independent random streams.
+
+    One master seed is expanded with numpy.random.SeedSequence into a
+    sequence per run (keyed by the run index, so it does not depend on which
+    worker runs it or in what order), and every run into named streams:
+    "engine" for the batched random decisions of a round, "network" for
+    network generation and shuffling and "schedule" for the scheduler (see
+    scheduler).
+"""
+import numpy as np
+
+STREAMS = {"engine": 0, "network": 1, "schedule": 2}
+
+
+def spawnSeeds(seed, n):
+    """ returns n independent integer seeds derived from the master seed """
+    return [int(child.generate_state(1)[0])
+            for child in np.random.SeedSequence(seed).spawn(n)]
+
+
+class RunSeeds(object):
+    """ the random streams of a single run """
+
+    def __init__(self, seed=None, runIndex=None):
+        if runIndex is None:
+            self.sequence = np.random.SeedSequence(seed)
+        else:
+            self.sequence = np.random.SeedSequence(seed,
+                                                   spawn_key=(runIndex,))
+
+    def stream(self, name):
+        """ returns the SeedSequence of a named stream """
+        seq = self.sequence
+        return np.random.SeedSequence(seq.entropy,
+                                      spawn_key=seq.spawn_key +
+                                      (STREAMS[name],),
+                                      pool_size=seq.pool_size)
+
+    def generator(self, name):
+        return np.random.Generator(np.random.PCG64(self.stream(name)))
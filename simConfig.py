@@ -0,0 +1,130 @@
+""" Loading of simulation parameters from JSON, YAML or TOML files.
+
+    A config file holds the keyword arguments of Agent.runSimulation, e.g.
+
+        smarts = 100
+        trusters = 50
+        coeff = 0.9
+        beta = 0.3
+        rounds = 1000
+        networkType = 1
+        logLevel = "summary"
+"""
+import json
+import os
+
+from matchEngine import typeNames
+from strategies import STRATEGIES
+
+# runSimulation parameters, with None for the ones without a default
+PARAMETERS = {
+    "smarts": None,
+    "trusters": None,
+    "coeff": None,
+    "beta": None,
+    "rounds": None,
+    "networkType": 1,
+    "clusterCoefficient": 0,
+    "topology": "bipartite",
+    "meanDegree": 10,
+    "shuffleChains": 1,
+    "networkCache": None,
+    "schedule": "sync",
+    "eventRate": 1.,
+    "participation": 1.,
+    "convergence": "off",
+    "convergenceTolerance": 1e-9,
+    "convergencePatience": 10,
+    "strategies": None,
+    "closedForm": False,
+    "randoms": 0,
+    "recs": 0,
+    "nonRecs": 0,
+    "warmupRounds": 30,
+    "seed": None,
+    "logPath": None,
+    "eventLog": None,
+    "logLevel": "summary",
+    "checkpointDir": None,
+    "checkpointEvery": 0,
+    "resume": False,
+    "statsPath": None,
+    "progress": False,
+}
+
+REQUIRED = ["smarts", "trusters", "coeff", "beta", "rounds"]
+
+
+def checkStrategy(typeName, name):
+    """ raises ValueError unless player type "typeName" can be given the
+        registered strategy "name"
+    """
+    if typeName not in typeNames:
+        raise ValueError("unknown player type: {0} (one of {1})".format(
+            typeName, ", ".join(typeNames)))
+    if name not in STRATEGIES:
+        raise ValueError("unknown strategy: {0} (one of {1})".format(
+            name, ", ".join(sorted(STRATEGIES))))
+
+
+def _loadYaml(f):
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("YAML config files require PyYAML")
+    return yaml.safe_load(f)
+
+
+def _loadToml(f):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ImportError("TOML config files require Python 3.11 or tomli")
+    return tomllib.load(f)
+
+
+def loadConfig(path):
+    """ reads a config file, the format is picked by its extension """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path) as f:
+            config = json.load(f)
+    elif ext in (".yaml", ".yml"):
+        with open(path) as f:
+            config = _loadYaml(f)
+    elif ext == ".toml":
+        with open(path, "rb") as f:
+            config = _loadToml(f)
+    else:
+        raise ValueError("unknown config file type: " + path)
+    config = config or {}
+    unknown = set(config) - set(PARAMETERS)
+    if unknown:
+        raise ValueError("unknown config parameters: " +
+                         ", ".join(sorted(unknown)))
+    return config
+
+
+def resolve(*layers):
+    """ merges the defaults with the given dicts, later ones win and None
+        values are ignored; raises ValueError if a required parameter is
+        still missing
+    """
+    params = dict(PARAMETERS)
+    for layer in layers:
+        for key, value in layer.items():
+            if value is not None:
+                params[key] = value
+    missing = [key for key in REQUIRED if params[key] is None]
+    if missing:
+        raise ValueError("missing parameters: " + ", ".join(missing))
+    strategies = params["strategies"] or {}
+    if not isinstance(strategies, dict):
+        raise ValueError("strategies must map player types to strategy "
+                         "names")
+    for typeName, name in strategies.items():
+        checkStrategy(typeName, name)
+    return params
@@ -0,0 +1,161 @@
+""" Batched player strategies.
+
+    A strategy decides for a whole batch of players at once. MatchEngine
+    keeps one strategy per player type and calls
+
+        decide_batch(self_ids, opponent_ids, state)
+            the decisions (bool array) of players self_ids against
+            opponent_ids: to trust for trusters, to reciprocate for trustees
+
+        update_batch(self_ids, opponent_ids, results, state, rounds=1)
+            after every match in which the truster trusted: results holds
+            the opponents' decisions; "rounds" asks for the effect of that
+            many identical matches at once
+
+        stable_batch(self_ids, opponent_ids, own, other, state)
+            which decisions "own" stay the same however often the match is
+            repeated with the opponents deciding "other" (and the truster
+            trusting); matches stable on both sides may be played in
+            closed form (see MatchEngine.runRounds). Defaults to none
+
+    where ids are engine indices and "state" is the MatchEngine, whose
+    arrays (trust, coefficient, threshold, trustor) and random generator
+    (state.randomBits) strategies may use. Per-pair memory belongs in
+    state.trust, the estimation of self_ids about opponent_ids, so that it
+    is checkpointed with the game. Strategies that draw random decisions
+    set "deterministic" to False, smart players' refusing to trust costs
+    the truster the bank fee if "refusalFee" is set, and strategies that
+    start estimations at the trusting coefficient set "needsCoefficient";
+    MatchEngine refuses them for players without one.
+
+    Strategies are registered under a name with @register and picked per
+    player type with the "strategies" parameter of Agent.runSimulation,
+    e.g. {"smart": "titForTat"}. The strategies named after the four player
+    classes are their batched versions and the default; they take their
+    rules from the classes, so both always play the same game.
+"""
+import numpy as np
+
+from AlwaysReciprocatePlayer import AlwaysReciprocatePlayer
+from NonReciprocativePlayer import NonReciprocativePlayer
+from SmartPlayer import smartPlayer
+
+STRATEGIES = {}
+
+
+def register(cls):
+    """ class decorator adding a strategy to the registry under its name """
+    STRATEGIES[cls.name] = cls
+    return cls
+
+
+def getStrategy(name):
+    """ returns a new instance of the strategy registered as "name" """
+    if not isinstance(name, str):
+        return name
+    if name not in STRATEGIES:
+        raise ValueError("unknown strategy: {0} (one of {1})".format(
+            name, ", ".join(sorted(STRATEGIES))))
+    return STRATEGIES[name]()
+
+
+class Strategy(object):
+    name = None
+    deterministic = True
+    refusalFee = False
+    needsCoefficient = False
+
+    def decide_batch(self, self_ids, opponent_ids, state):
+        raise NotImplementedError
+
+    def update_batch(self, self_ids, opponent_ids, results, state,
+                     rounds=1):
+        pass
+
+    def stable_batch(self, self_ids, opponent_ids, own, other, state):
+        return np.zeros(len(self_ids), dtype=bool)
+
+
+@register
+class SmartStrategy(Strategy):
+    """ smartPlayer: trusts while its estimation of the opponent reaches
+        smartPlayer.threshold and scales it by smartPlayer.trustFactor
+    """
+    name = "smart"
+    refusalFee = True
+    needsCoefficient = True
+
+    def decide_batch(self, self_ids, opponent_ids, state):
+        mem = state.trust.lookup(self_ids, opponent_ids,
+                                 state.coefficient[self_ids])
+        return mem >= state.threshold[self_ids]
+
+    def _factors(self, self_ids, results, state):
+        return smartPlayer.trustFactor(state.coefficient[self_ids], results)
+
+    def update_batch(self, self_ids, opponent_ids, results, state,
+                     rounds=1):
+        factors = self._factors(self_ids, results, state)
+        if rounds != 1:
+            factors = factors ** rounds
+        state.trust.scale(self_ids, opponent_ids, factors)
+
+    def stable_batch(self, self_ids, opponent_ids, own, other, state):
+        # a trusting estimation must not shrink, a refusing one not grow
+        factors = self._factors(self_ids, other, state)
+        return np.where(own, factors >= 1, factors <= 1)
+
+
+@register
+class RandomStrategy(Strategy):
+    """ RandomPlayer: a fair coin per decision """
+    name = "random"
+    deterministic = False
+
+    def decide_batch(self, self_ids, opponent_ids, state):
+        return state.randomBits(len(self_ids))
+
+
+class FixedStrategy(Strategy):
+    """ the same decision against everyone """
+    decision = False
+
+    def decide_batch(self, self_ids, opponent_ids, state):
+        return np.full(len(self_ids), self.decision, dtype=bool)
+
+    def stable_batch(self, self_ids, opponent_ids, own, other, state):
+        return np.ones(len(self_ids), dtype=bool)
+
+
+@register
+class AlwaysReciprocateStrategy(FixedStrategy):
+    name = "alwaysReciprocate"
+    decision = AlwaysReciprocatePlayer.decision
+
+
+@register
+class NonReciprocativeStrategy(FixedStrategy):
+    name = "nonReciprocative"
+    decision = NonReciprocativePlayer.decision
+
+
+@register
+class TitForTatStrategy(Strategy):
+    """ cooperates in the first match against an opponent, then does what
+        the opponent did in their last match. The opponent's last decision
+        is kept as the estimation, 1 or 0
+    """
+    name = "titForTat"
+    refusalFee = True
+
+    def decide_batch(self, self_ids, opponent_ids, state):
+        mem = state.trust.lookup(self_ids, opponent_ids,
+                                 np.ones(len(self_ids)))
+        return mem >= 0.5
+
+    def update_batch(self, self_ids, opponent_ids, results, state,
+                     rounds=1):
+        state.trust.set(self_ids, opponent_ids, results.astype(np.float64))
+
+    def stable_batch(self, self_ids, opponent_ids, own, other, state):
+        return own & other
@@ -0,0 +1,109 @@
+""" Parameter sweeps over Agent.runSimulation.
+
+    A grid maps runSimulation keyword arguments to lists of values, e.g.
+
+        {"smarts": [50], "trusters": [25], "coeff": [0.5, 0.7, 0.9],
+         "beta": [0.1, 0.3], "rounds": [1000], "randoms": [0, 10]}
+
+    Every combination is run "replicates" times on a process pool. Each run
+    gets its own seed derived from the master seed and its run index, so a
+    sweep gives the same table regardless of the number of workers, and rows
+    are written to the output CSV as soon as their run finishes.
+
+    A row holds the run index, replicate and seed, the parameters of the run,
+    the summary of its final state with its keys prefixed by "result." and
+    the run's wall-clock seconds.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from itertools import product
+from multiprocessing import Pool
+
+import Agent
+from seeding import spawnSeeds
+
+# prefix of the summary columns, which would otherwise collide with
+# parameters of the same name
+RESULT_PREFIX = "result."
+
+
+def expandGrid(grid):
+    """ returns one parameter dict per combination of the grid values """
+    keys = sorted(grid)
+    return [dict(zip(keys, values))
+            for values in product(*(grid[key] for key in keys))]
+
+
+def _runOne(task):
+    runIndex, replicate, params, seed = task
+    start = time.perf_counter()
+    summary = Agent.runSimulation(seed=seed, **params)
+    row = {"run": runIndex, "replicate": replicate, "seed": seed}
+    row.update(params)
+    row.update((RESULT_PREFIX + key, value) for key, value in summary.items())
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def runSweep(grid, replicates=1, seed=0, workers=None, out=None,
+             chunksize=1):
+    """ runs every grid combination "replicates" times and returns the rows
+        of the aggregated table, sorted by run index. If "out" is a path the
+        rows are also streamed to it as CSV
+    """
+    combos = expandGrid(grid)
+    tasks = [(combo * replicates + rep, rep, params)
+             for combo, params in enumerate(combos)
+             for rep in range(replicates)]
+    seeds = spawnSeeds(seed, len(tasks))
+    tasks = [task + (seeds[task[0]],) for task in tasks]
+    rows = []
+    f = None
+    writer = None
+    try:
+        if out is not None:
+            f = open(out, "w", newline="")
+        with Pool(workers) as pool:
+            for row in pool.imap_unordered(_runOne, tasks, chunksize):
+                rows.append(row)
+                if f is None:
+                    continue
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+                f.flush()
+    finally:
+        if f is not None:
+            f.close()
+    rows.sort(key=lambda row: row["run"])
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("grid", help="JSON file mapping parameters to lists "
+                                     "of values")
+    parser.add_argument("-r", "--replicates", type=int, default=1)
+    parser.add_argument("-s", "--seed", type=int, default=0,
+                        help="master seed")
+    parser.add_argument("-w", "--workers", type=int, default=None,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("-o", "--out", default="sweep.csv",
+                        help="output CSV file")
+    parser.add_argument("--chunksize", type=int, default=1)
+    args = parser.parse_args(argv)
+    with open(args.grid) as f:
+        grid = json.load(f)
+    start = time.perf_counter()
+    rows = runSweep(grid, args.replicates, args.seed, args.workers, args.out,
+                    args.chunksize)
+    print("{0} runs in {1:.1f}s, results in {2}".format(
+        len(rows), time.perf_counter() - start, args.out))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
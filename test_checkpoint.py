@@ -0,0 +1,49 @@
+import filecmp
+
+import pytest
+
+import Agent
+import checkpoint
+import eventLog
+from eventLog import LOG_FULL
+from profiling import Profiler
+
+ROUNDS = 40
+GAME = {"smarts": 8, "trusters": 4, "coeff": 0.9, "beta": 0.3,
+        "rounds": ROUNDS, "randoms": 4, "recs": 2, "nonRecs": 2,
+        "warmupRounds": 30, "seed": 11, "logLevel": LOG_FULL}
+
+
+@pytest.mark.parametrize("schedule", [
+    {"schedule": "sync"},
+    {"schedule": "poisson", "eventRate": 1.5, "participation": 0.7},
+])
+def test_resume_matches_uninterrupted_run(tmp_path, schedule):
+    straight = Agent.runSimulation(logPath=str(tmp_path / "straight.txt"),
+                                   statsPath=str(tmp_path / "straight.bin"),
+                                   **dict(GAME, **schedule))
+
+    # the run is checkpointed halfway, then resumed from there
+    directory = str(tmp_path / "checkpoints")
+    resumed = dict(GAME, logPath=str(tmp_path / "resumed.txt"),
+                   statsPath=str(tmp_path / "resumed.bin"),
+                   checkpointDir=directory, checkpointEvery=ROUNDS // 2,
+                   **schedule)
+    Agent.runSimulation(**resumed)
+    assert checkpoint.load(directory).round == ROUNDS // 2
+    profiler = Profiler()
+    summary = Agent.runSimulation(resume=True, profiler=profiler, **resumed)
+
+    assert profiler.counters["rounds"] == ROUNDS - ROUNDS // 2
+    assert summary == straight
+    assert filecmp.cmp(str(tmp_path / "straight.txt"),
+                       str(tmp_path / "resumed.txt"), shallow=False)
+    assert filecmp.cmp(str(tmp_path / "straight.bin"),
+                       str(tmp_path / "resumed.bin"), shallow=False)
+
+
+def test_resumable_event_log_is_npz(tmp_path, monkeypatch):
+    # as if pyarrow were installed: Parquet logs cannot be resumed
+    monkeypatch.setattr(eventLog, "pyarrow", object())
+    sink = eventLog.openEventSink(str(tmp_path / "events"), resumable=True)
+    assert isinstance(sink, eventLog.NpzEventSink)
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import clusterRandNetwork
+import networks
+from csrGraph import ShuffleGraph
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_shuffle_without_triplets_returns_graph_unchanged(incremental):
+    # a perfect matching: no vertex has two neighbours to close a triangle
+    edges = np.array([[0, 1], [2, 3], [4, 5]])
+    G = ShuffleGraph(6, edges)
+    with pytest.warns(RuntimeWarning):
+        G_shuf, niter, gcc = clusterRandNetwork.bansal_shuffle(
+            G, 0.2, seed=1, incremental=incremental)
+    assert niter == 0
+    assert gcc == 0
+    assert sorted(map(tuple, G_shuf.edgeArray())) == sorted(map(tuple, edges))
+
+
+@pytest.mark.parametrize("target", [0.15, 0.01])
+def test_incremental_shuffle_tracks_transitivity(target):
+    edges = networks.erdosRenyi(200, 0.05, rng=1)
+    G = ShuffleGraph(200, edges)
+    degrees = G.degree()
+    G_shuf, niter, gcc = clusterRandNetwork.bansal_shuffle(
+        G, target, maxiter=2000, seed=1, incremental=True)
+    assert niter > 0
+    assert gcc == pytest.approx(G_shuf.transitivity_undirected())
+    assert G_shuf.degree() == degrees
@@ -0,0 +1,61 @@
+import numpy as np
+
+import Agent
+from population import Population
+from player import PlayerRegistry
+from matchEngine import MatchEngine
+from profiling import Profiler
+
+ROUNDS = 3000
+GAME = {"smarts": 30, "trusters": 15, "coeff": 0.99, "beta": 0.3,
+        "rounds": ROUNDS, "randoms": 5, "recs": 10, "nonRecs": 5,
+        "warmupRounds": 30, "seed": 3}
+
+
+def run(**params):
+    profiler = Profiler()
+    summary = Agent.runSimulation(profiler=profiler, **dict(GAME, **params))
+    return summary, profiler.counters
+
+
+def test_forward_matches_full_play():
+    full, fullCounters = run()
+    forward, forwardCounters = run(convergence="forward")
+    assert forwardCounters["forwardedRounds"] > 0
+    assert forwardCounters["rounds"] + forwardCounters["forwardedRounds"] \
+        == ROUNDS
+    assert sorted(forward) == sorted(full)
+    for key in full:
+        assert np.allclose(forward[key], full[key], equal_nan=True), key
+
+
+def test_stop_ends_once_stationary():
+    patience = 10
+    game = dict(GAME, randoms=0)
+    summary, counters = run(randoms=0, convergence="stop",
+                            convergencePatience=patience)
+
+    # the last round in which a decision or an estimation changed, from
+    # playing the game without detection
+    population = Population.fromCounts(game["smarts"], game["trusters"],
+                                       game["coeff"], 0, game["recs"],
+                                       game["nonRecs"], PlayerRegistry())
+    trusters = int(population.trustor.sum())
+    p1, p2 = Agent.networkEdges(1, trusters, len(population) - trusters)
+    engine = MatchEngine(population, game["warmupRounds"], pairs=(p1, p2))
+    last = None
+    changed = 0
+    for i in range(ROUNDS):
+        decisions = np.concatenate(engine.playRound(p1, p2)[:2])
+        trust = np.concatenate((
+            engine.trust.lookup(p1, p2, engine.coefficient[p1]),
+            engine.trust.lookup(p2, p1, engine.coefficient[p2])))
+        if last is None or engine.warmupMatches > 0 or \
+                not np.array_equal(decisions, last[0]) or \
+                np.abs(trust - last[1]).max() > 1e-9:
+            changed = i
+        last = decisions, trust
+        if i - changed >= patience:
+            break
+    assert counters["stoppedRounds"] > 0
+    assert counters["rounds"] == changed + patience + 1
@@ -0,0 +1,107 @@
+import random
+
+import numpy as np
+import pytest
+
+import Agent
+from AlwaysReciprocatePlayer import AlwaysReciprocatePlayer
+from NonReciprocativePlayer import NonReciprocativePlayer
+from RandomPlayer import RandomPlayer
+from SmartPlayer import smartPlayer
+from matchEngine import MatchEngine
+from player import PlayerRegistry, registry
+from population import Population
+
+SEED = 5
+ROUNDS = 40
+WARMUP = 30
+
+
+def mixedPlayers():
+    """ trusters and trustees of every player type, with fresh ids """
+    registry.reset()
+    Agent.global_beta = 0.3
+    players = (Agent.smartCreator(8, 4, 0.9) +
+               [RandomPlayer(i % 2 == 0, 0.9) for i in range(4)] +
+               [AlwaysReciprocatePlayer(i % 2 == 0, None, 0.3)
+                for i in range(2)] +
+               [NonReciprocativePlayer(i % 2 == 0, None) for i in range(2)])
+    trusters = [p for p in players if p.trustor]
+    trustees = [p for p in players if not p.trustor]
+    return trusters, trustees
+
+
+def outcome(players):
+    return [(p.currency, p.estimations() if isinstance(p, smartPlayer)
+             else {}) for p in players]
+
+
+def test_engine_matches_runMatch():
+    random.seed(SEED)
+    trusters, trustees = mixedPlayers()
+    warmup = WARMUP
+    for i in range(ROUNDS):
+        for truster in trusters:
+            for trustee in trustees:
+                Agent.runMatch(truster, trustee, warmup > 0)
+                warmup -= 1
+    expected = outcome(trusters + trustees)
+
+    random.seed(SEED)
+    trusters, trustees = mixedPlayers()
+    engine = MatchEngine(trusters + trustees, WARMUP)
+    p1 = np.repeat(engine.indicesOf(trusters), len(trustees))
+    p2 = np.tile(engine.indicesOf(trustees), len(trusters))
+    engine.runRounds(ROUNDS, p1, p2)
+    engine.sync()
+    assert outcome(trusters + trustees) == expected
+
+
+def test_smart_strategy_for_other_types():
+    registry.reset()
+    Agent.global_beta = 0.3
+    trusters = Agent.smartCreator(2, 2, 0.9)
+    trustees = [RandomPlayer(False, 0.9) for i in range(3)]
+
+    # player objects of other types have no trusting coefficient
+    with pytest.raises(ValueError):
+        MatchEngine(trusters + trustees, strategies={"random": "smart"})
+
+    # a population gives every player the run's coefficient
+    population = Population.fromCounts(2, 2, 0.9, 3,
+                                       registry=PlayerRegistry())
+    p1 = np.repeat([0, 1], 3)
+    p2 = np.tile([2, 3, 4], 2)
+    engine = MatchEngine(population, pairs=(p1, p2),
+                         strategies={"random": "smart"})
+    engine.playRound(p1, p2)
+    # the trusters trusted, so the trustees' estimations were scaled once
+    trust = engine.trust.lookup(p2, p1, engine.coefficient[p2])
+    assert np.allclose(trust, 0.9 * 0.9)
+
+
+def playedEngine(closedForm):
+    """ a mixed population after 200 rounds, and how many matches were
+        played one by one
+    """
+    registry.reset()
+    smartPlayer.bank.global_bank_fee = 0.3
+    AlwaysReciprocatePlayer.bank.global_bank_fee = 0.3
+    population = Population.fromCounts(40, 20, 0.9, 10, 10, 10,
+                                       registry=PlayerRegistry())
+    trusters = np.flatnonzero(population.trustor)
+    trustees = np.flatnonzero(~population.trustor)
+    p1 = np.repeat(trusters, len(trustees))
+    p2 = np.tile(trustees, len(trusters))
+    engine = MatchEngine(population, WARMUP,
+                         rng=np.random.default_rng(SEED), pairs=(p1, p2))
+    played = engine.runRounds(200, p1, p2, closedForm=closedForm)
+    return engine, played, engine.trust.lookup(p1, p2, engine.coefficient[p1])
+
+
+def test_closed_form_matches_full_play():
+    full, fullPlayed, fullTrust = playedEngine(False)
+    closed, closedPlayed, closedTrust = playedEngine(True)
+    assert closedPlayed < fullPlayed
+    assert np.allclose(closed.currency, full.currency)
+    assert np.allclose(closedTrust, fullTrust)
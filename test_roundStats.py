@@ -0,0 +1,24 @@
+import json
+
+import numpy as np
+
+from roundStats import RunningStats
+
+
+def test_running_stats_skip_nan():
+    rows = np.array([[1., np.nan, np.nan],
+                     [2., 0.5, np.nan],
+                     [4., np.nan, np.nan],
+                     [5., 1.5, np.nan]])
+    stats = RunningStats()
+    for row in rows:
+        stats.add(row)
+    assert stats.n.tolist() == [4, 2, 0]
+    assert np.allclose(stats.average[:2], np.nanmean(rows[:, :2], axis=0))
+    assert np.allclose(stats.variance[:2], np.nanvar(rows[:, :2], axis=0))
+    assert np.isnan(stats.average[2]) and np.isnan(stats.variance[2])
+
+    # as checkpointed
+    resumed = RunningStats.fromState(json.loads(json.dumps(stats.state())))
+    assert np.array_equal(resumed.n, stats.n)
+    assert np.allclose(resumed.average[:2], stats.average[:2])
@@ -0,0 +1,135 @@
+import numpy as np
+
+
+class TrustStore(object):
+    """ Dense N x N store of trust estimations, indexed by player id.
+
+        values[i, j] is player i's estimation of player j. Entries start as
+        NaN and are lazily initialised to the trusting coefficient given on
+        first lookup; updates are multiplicative and done in place, so the
+        whole trust state is a single contiguous buffer.
+    """
+
+    def __init__(self, n, dtype=np.float32):
+        self.values = np.full((n, n), np.nan, dtype=dtype)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes
+
+    def get(self, i, j, default):
+        """ returns i's estimation of j, initialising it to "default" """
+        value = self.values[i, j]
+        if value != value:
+            value = self.values[i, j] = default
+        return value
+
+    def lookup(self, rows, cols, defaults):
+        """ vectorized get, "defaults" holds one value per (row, col) pair """
+        mem = self.values[rows, cols]
+        unset = np.isnan(mem)
+        if unset.any():
+            mem[unset] = np.asarray(defaults)[unset]
+            self.values[rows, cols] = mem
+        return mem
+
+    def set(self, i, j, value):
+        self.values[i, j] = value
+
+    def scale(self, rows, cols, factors):
+        """ multiplies the estimations in place; pairs must be unique """
+        self.values[rows, cols] *= factors
+
+    def row(self, i):
+        """ returns the known estimations of player i as {j: value} """
+        row = self.values[i]
+        known = np.flatnonzero(~np.isnan(row))
+        return dict(zip(known.tolist(), row[known].tolist()))
+
+    def buffer(self):
+        """ returns the underlying buffer without copying it """
+        return self.values
+
+    def snapshot(self):
+        return self.values.copy()
+
+    def restore(self, buf):
+        self.values[...] = buf
+
+
+class SparseTrustStore(TrustStore):
+    """ Trust store holding only a fixed set of (i, j) pairs, e.g. the edges of
+        a sparse network, in COO form sorted by row then column.
+
+        Lookups are a binary search over the sorted pair keys; asking for a
+        pair outside the pattern raises KeyError.
+    """
+
+    def __init__(self, n, rows, cols, dtype=np.float32):
+        self.n = n
+        keys = np.asarray(rows, dtype=np.int64) * n + np.asarray(
+            cols, dtype=np.int64)
+        keys.sort()
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        keys = keys[first]
+        self.keys = keys
+        self.rows = (keys // n).astype(np.int32)
+        self.cols = (keys % n).astype(np.int32)
+        self.indptr = np.searchsorted(
+            keys, np.arange(n + 1, dtype=np.int64) * n).astype(np.int32)
+        self.values = np.full(len(keys), np.nan, dtype=dtype)
+
+    def __len__(self):
+        return self.n
+
+    def _positions(self, rows, cols):
+        wanted = np.asarray(rows, dtype=np.int64) * self.n + np.asarray(
+            cols, dtype=np.int64)
+        pos = np.searchsorted(self.keys, wanted)
+        pos = np.minimum(pos, len(self.keys) - 1)
+        if len(self.keys) == 0 or np.any(self.keys[pos] != wanted):
+            raise KeyError("pair is not part of the trust store pattern")
+        return pos
+
+    def get(self, i, j, default):
+        pos = self._positions(i, j)
+        value = self.values[pos]
+        if value != value:
+            value = self.values[pos] = default
+        return value
+
+    def lookup(self, rows, cols, defaults):
+        pos = self._positions(rows, cols)
+        mem = self.values[pos]
+        unset = np.isnan(mem)
+        if unset.any():
+            mem[unset] = np.asarray(defaults)[unset]
+            self.values[pos] = mem
+        return mem
+
+    def set(self, i, j, value):
+        self.values[self._positions(i, j)] = value
+
+    def scale(self, rows, cols, factors):
+        self.values[self._positions(rows, cols)] *= factors
+
+    def row(self, i):
+        start, end = self.indptr[i], self.indptr[i + 1]
+        vals = self.values[start:end]
+        known = ~np.isnan(vals)
+        return dict(zip(self.cols[start:end][known].tolist(),
+                        vals[known].tolist()))
+
+
+def createTrustStore(n, rows=None, cols=None, dtype=np.float32,
+                     maxDensity=0.1):
+    """ returns a sparse store when the allowed pairs fill less than
+        "maxDensity" of the N x N matrix, a dense store otherwise
+    """
+    if rows is not None and len(rows) < maxDensity * n * n:
+        return SparseTrustStore(n, rows, cols, dtype)
+    return TrustStore(n, dtype)